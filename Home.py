@@ -1,19 +1,31 @@
 # Para que a integração das páginas funcione, é necessário criar uma pasta com o nome 'pages' no mesmo diretório que este arquivo.
 
 import streamlit as st
-from PIL import Image
+from utils.assets import logo
+from utils.data import dataset_caption, load_data, memory_report, start_refresher
+from utils.instrument import start_run, debug_panel
 
 st.set_page_config(
     page_title='Home',
 )
 
+# Medição das etapas desta execução (só com CURRY_PROFILE=1, ver utils/instrument.py)
+start_run('Home')
+
+# Atualização do dataset em segundo plano quando o csv muda (CURRY_REFRESH_S, ver utils/data.py)
+start_refresher('train.csv')
+
+# Carrega e limpa o train.csv já na abertura do app, deixando o cache pronto para as páginas
+df1 = load_data('train.csv')
+
 #image = Image.open(r"C:\Users\andreliziero\Documents\repos\ftc\logo.png")
-image = Image.open('logo.png')
+image = logo()
 st.sidebar.image(image, width=120)
 
 st.sidebar.markdown('# Curry Company')
 st.sidebar.markdown('## Fastest Delivery in Town')
 st.sidebar.markdown("""---""")
+st.sidebar.caption(dataset_caption('train.csv'))
 
 st.write('# Curry company Growth Dashboard')
 
@@ -29,7 +41,14 @@ st.markdown(
         - Acompanhamento dos indicadores semanais de crescimento.
     - Visão Restaurantes:
         - Indicadores semanais de crescimento dos restaurantes
+    - Visão Regiões:
+        - Pedidos, entregadores e tempo médio de entrega num raio em volta de um ponto, por bairro.
 
     ### Ask for Help
     - @andreliziero
-    """)
\ No newline at end of file
+    """)
+
+with st.expander('Uso de memória do dataset'):
+    st.dataframe(memory_report(df1))
+
+debug_panel()
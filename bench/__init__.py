@@ -0,0 +1 @@
+# Gerador de train.csv sintético e benchmark do dashboard (python -m bench.run).
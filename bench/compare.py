@@ -0,0 +1,48 @@
+#Libraries
+import argparse
+import json
+
+#========================================
+#Comparação de benchmarks
+#========================================
+# Compara dois json do bench/run.py (ex.: antes e depois de uma mudança), etapa por etapa.
+
+#========================================
+#Funções
+#========================================
+def load_results(path):
+    """
+    lê um json do bench/run.py.
+    Input: String
+    Output: Dict (meta), Dict ((rows, step) -> linha)
+    """
+    with open(path) as f:
+        report = json.load(f)
+    return report['meta'], {(line['rows'], line['step']): line for line in report['results']}
+
+def compare(before, after):
+    """
+    gera as linhas da comparação: tempo e pico de memória antes/depois e a razão depois/antes.
+    Etapas que só existem num dos arquivos aparecem com o outro lado vazio.
+    Input: Dict, Dict (resultados de load_results)
+    Output: lista de tuplas (rows, step, s_antes, s_depois, razão, mb_antes, mb_depois)
+    """
+    lines = []
+    for key in sorted(set(before) | set(after)):
+        b, a = before.get(key), after.get(key)
+        ratio = a['seconds'] / b['seconds'] if a and b and b['seconds'] > 0 else None
+        lines.append(key + (b and b['seconds'], a and a['seconds'], ratio, b and b['peak_mb'], a and a['peak_mb']))
+    return lines
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara dois resultados do bench/run.py.')
+    parser.add_argument('before')
+    parser.add_argument('after')
+    args = parser.parse_args()
+    meta_before, before = load_results(args.before)
+    meta_after, after = load_results(args.after)
+    print('antes: {} ({})   depois: {} ({})'.format(meta_before['commit'], meta_before['date'], meta_after['commit'], meta_after['date']))
+    fmt = lambda v, spec: '-' if v is None else format(v, spec)
+    for rows, step, sb, sa, ratio, mb, ma in compare(before, after):
+        print('{:>10} {:<45} {:>10}s {:>10}s {:>7}x {:>9} MB {:>9} MB'.format(
+            rows, step, fmt(sb, '.4f'), fmt(sa, '.4f'), fmt(ratio, '.2f'), fmt(mb, '.1f'), fmt(ma, '.1f')))
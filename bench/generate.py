@@ -0,0 +1,125 @@
+#Libraries
+import argparse
+import os
+
+#Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+
+#========================================
+#Gerador do train.csv sintético
+#========================================
+# Gera um train.csv com o mesmo layout do dataset original, incluindo o que o clean_code
+# trata: textos com espaço no final ('Urban ', 'Jam '), o marcador 'NaN ' de valor ausente,
+# 'conditions NaN' no clima, o tempo como '(min) N' e latitudes negativas ocasionais.
+# Os restaurantes ficam agrupados em volta de cidades reais da Índia, como no original.
+# Arquivos grandes são gerados em blocos, sem montar o DataFrame inteiro em memória.
+CHUNK_ROWS = 1_000_000
+
+CITIES = {'INDO': (22.72, 75.86), 'BANG': (12.97, 77.59), 'COIMB': (11.02, 76.96), 'CHEN': (13.08, 80.27),
+          'HYD': (17.39, 78.49), 'RANCHI': (23.34, 85.31), 'MYS': (12.30, 76.64), 'DEH': (30.32, 78.03),
+          'KOC': (9.93, 76.27), 'PUNE': (18.52, 73.86), 'MUM': (19.08, 72.88), 'JAP': (26.91, 75.79),
+          'SUR': (21.17, 72.83), 'KOL': (22.57, 88.36), 'AGR': (27.18, 78.01), 'VAD': (22.31, 73.18),
+          'LUDH': (30.90, 75.86), 'ALH': (25.44, 81.85), 'GOA': (15.49, 73.83), 'AURG': (19.88, 75.34)}
+RESTAURANTS_PER_CITY = 20
+COURIERS_PER_RESTAURANT = 3
+
+AREAS = np.array(['Metropolitian ', 'Urban ', 'Semi-Urban '])
+TRAFFIC = np.array(['Low ', 'Medium ', 'High ', 'Jam '])
+WEATHER = np.array(['conditions Sunny', 'conditions Stormy', 'conditions Sandstorms',
+                    'conditions Cloudy', 'conditions Fog', 'conditions Windy'])
+ORDERS = np.array(['Snack ', 'Meal ', 'Drinks ', 'Buffet '])
+VEHICLES = np.array(['motorcycle ', 'scooter ', 'electric_scooter ', 'bicycle '])
+
+#========================================
+#Funções
+#========================================
+def with_missing(rng, values, p = 0.03, token = 'NaN '):
+    """
+    troca uma fração p dos valores pelo marcador de valor ausente do csv original.
+    Input: Generator, array, Float, String
+    Output: array (object)
+    """
+    values = np.asarray(values).astype(object)
+    values[rng.random(len(values)) < p] = token
+    return values
+
+def generate_chunk(n, seed = 0, start = '2022-02-11', days = 55, first_id = 0):
+    """
+    gera n pedidos sintéticos no layout do train.csv.
+    Input: Int, Int (semente), String (primeira data), Int (quantidade de dias), Int (primeiro ID)
+    Output: DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    codes = np.array(list(CITIES))
+    centers = np.array(list(CITIES.values()))
+
+    # cada restaurante tem uma posição fixa perto do centro da sua cidade
+    restaurant = rng.integers(0, len(codes) * RESTAURANTS_PER_CITY, n)
+    city = restaurant // RESTAURANTS_PER_CITY
+    spot = np.random.default_rng(12345).normal(0, 0.05, (len(codes) * RESTAURANTS_PER_CITY, 2))
+    rest_lat = centers[city, 0] + spot[restaurant, 0]
+    rest_lng = centers[city, 1] + spot[restaurant, 1]
+    dlv_lat = rest_lat + rng.normal(0, 0.04, n)
+    dlv_lng = rest_lng + rng.normal(0, 0.04, n)
+    # coordenadas negativas (o clean_code usa o valor absoluto) e zeradas (não informadas)
+    rest_lat = np.where(rng.random(n) < 0.02, -rest_lat, rest_lat)
+    zero = rng.random(n) < 0.005
+    rest_lat[zero] = 0.0
+    rest_lng[zero] = 0.0
+
+    # os textos são montados uma vez por valor possível e indexados pelos números sorteados
+    courier_ids = np.array(['{}RES{:02d}DEL{:02d} '.format(codes[r // RESTAURANTS_PER_CITY], r % RESTAURANTS_PER_CITY + 1, c + 1)
+                            for r in range(len(codes) * RESTAURANTS_PER_CITY) for c in range(COURIERS_PER_RESTAURANT)])
+    courier_id = courier_ids[restaurant * COURIERS_PER_RESTAURANT + rng.integers(0, COURIERS_PER_RESTAURANT, n)]
+    dates = pd.date_range(start, periods=days).strftime('%d-%m-%Y').to_numpy()
+    clock = np.array(['{:02d}:{:02d}:00'.format(m // 60, m % 60) for m in range(24 * 60)])
+    minute_orderd = rng.integers(8 * 60, 24 * 60 - 15, n) // 5 * 5
+    minute_picked = minute_orderd + rng.choice([5, 10, 15], n)
+
+    return pd.DataFrame({
+        'ID': pd.Series(np.arange(first_id, first_id + n)).map('0x{:05x} '.format),
+        'Delivery_person_ID': courier_id,
+        'Delivery_person_Age': with_missing(rng, rng.integers(18, 40, n).astype(str)),
+        'Delivery_person_Ratings': with_missing(rng, np.round(rng.uniform(2.5, 5, n), 1).astype(str)),
+        'Restaurant_latitude': np.round(rest_lat, 6),
+        'Restaurant_longitude': np.round(rest_lng, 6),
+        'Delivery_location_latitude': np.round(dlv_lat, 6),
+        'Delivery_location_longitude': np.round(dlv_lng, 6),
+        'Order_Date': dates[rng.integers(0, days, n)],
+        'Time_Orderd': with_missing(rng, clock[minute_orderd]),
+        'Time_Order_picked': clock[minute_picked],
+        'Weatherconditions': with_missing(rng, rng.choice(WEATHER, n), token='conditions NaN'),
+        'Road_traffic_density': with_missing(rng, rng.choice(TRAFFIC, n)),
+        'Vehicle_condition': rng.integers(0, 4, n),
+        'Type_of_order': rng.choice(ORDERS, n),
+        'Type_of_vehicle': rng.choice(VEHICLES, n),
+        'multiple_deliveries': with_missing(rng, rng.integers(0, 4, n).astype(str)),
+        'Festival': with_missing(rng, rng.choice(np.array(['No ', 'Yes ']), n, p=[0.95, 0.05])),
+        'City': with_missing(rng, AREAS[rng.integers(0, len(AREAS), n)]),
+        'Time_taken(min)': '(min) ' + pd.Series(rng.integers(10, 55, n)).astype(str),
+    })
+
+def generate_csv(path, rows, seed = 0, days = 55, chunk_rows = CHUNK_ROWS):
+    """
+    grava um train.csv sintético com rows pedidos, em blocos de chunk_rows linhas.
+    O mesmo (rows, seed, days) sempre gera o mesmo arquivo.
+    Input: String, Int, Int, Int, Int
+    Output: String (caminho gravado)
+    """
+    tmp = path + '.tmp'
+    with open(tmp, 'w', newline='') as f:
+        for i, start in enumerate(range(0, rows, chunk_rows)):
+            df_aux = generate_chunk(min(chunk_rows, rows - start), seed=seed + i, days=days, first_id=start)
+            df_aux.to_csv(f, index=False, header=(i == 0))
+    os.replace(tmp, path)
+    return path
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera um train.csv sintético no layout do dataset original.')
+    parser.add_argument('rows', type=int, help='quantidade de pedidos (ex.: 10000, 100000, 1000000, 10000000)')
+    parser.add_argument('path', nargs='?', default='train.csv', help='arquivo de saída (padrão: train.csv)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--days', type=int, default=55, help='quantidade de dias de histórico (padrão: 55, como o original)')
+    args = parser.parse_args()
+    generate_csv(args.path, args.rows, seed=args.seed, days=args.days)
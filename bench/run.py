@@ -0,0 +1,214 @@
+#Libraries
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime as dt
+
+#Bibliotecas necessárias
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import numpy as np
+import pandas as pd
+from bench.generate import generate_csv
+from utils import metrics, parallel, store
+from utils.data import read_raw, clean_code, load_data, clear_cache
+from utils.cube import build_cube
+from utils.date_index import DateIndex
+from utils.courier_index import CourierIndex
+from utils.spatial_index import GridIndex
+from utils.sketch import build_time_sketch
+
+#========================================
+#Benchmark
+#========================================
+# Mede, para cada tamanho de train.csv sintético (bench/generate.py), o tempo e o pico de
+# memória da carga, da limpeza, dos agregados e de cada função de gráfico/tabela das páginas.
+# O resultado é um json com os metadados da execução (commit, versões) e uma linha por
+# (tamanho, etapa), para comparar execuções de commits diferentes com bench/compare.py.
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+DATA_DIR = os.path.join(ROOT, 'bench', 'data')
+PAGES = ['pages/visao_empresa.py', 'pages/visao_entregadores.py', 'pages/visao_restaurantes.py']
+
+# Meta de inicialização: tempo de um processo Python novo até uma página ter importado
+# tudo o que usa (o que uma réplica recém-criada paga antes da primeira renderização)
+STARTUP_TARGET_S = 2.0
+STARTUP_PAGES = ['Home.py'] + PAGES + ['pages/visao_regioes.py']
+STARTUP_CODE = '''
+import os, sys
+sys.path.insert(0, {root!r})
+source = open(os.path.join({root!r}, {page!r}), encoding='utf-8').read()
+marker = '#___________________Início'
+exec(compile(source[:source.index(marker)] if marker in source else source.split('st.set_page_config')[0], {page!r}, 'exec'), {{}})
+'''
+
+#========================================
+#Funções
+#========================================
+def load_page_functions(page):
+    """
+    carrega as funções de uma página sem executar o layout: roda só o trecho do arquivo
+    antes do marcador '#___Início do código para o Streamlit___'.
+    Input: String (caminho da página relativo à raiz do repositório)
+    Output: Dict (nome -> objeto definido na página)
+    """
+    with open(os.path.join(ROOT, page), encoding='utf-8') as f:
+        source = f.read()
+    namespace = {'__name__': 'bench_' + os.path.splitext(os.path.basename(page))[0]}
+    exec(compile(source[:source.index('#___________________Início')], page, 'exec'), namespace)
+    return namespace
+
+def page_steps(path):
+    """
+    gera as etapas das páginas: cada função de gráfico/tabela com a data limite no último
+    dia e todas as condições de trânsito selecionadas (o estado inicial das páginas).
+    Input: String (csv)
+    Output: lista de (nome, função sem argumentos)
+    """
+    sel = metrics.Selection(path)
+    empresa, restaurantes = (load_page_functions(page) for page in ('pages/visao_empresa.py', 'pages/visao_restaurantes.py'))
+    steps = [('empresa.order_by_date', lambda: empresa['order_by_date'](sel)),
+             ('empresa.order_by_traffic', lambda: empresa['order_by_traffic'](sel)),
+             ('empresa.order_by_traffic_city', lambda: empresa['order_by_traffic_city'](sel)),
+             ('empresa.order_by_week', lambda: empresa['order_by_week'](sel)),
+             ('empresa.order_by_week_deliver', lambda: empresa['order_by_week_deliver'](metrics.weekly_orders_per_courier(sel)))]
+    steps += [('empresa.country_map[{}]'.format(mode), lambda mode=mode: empresa['country_map'](sel, mode))
+              for mode in empresa['MAP_MODES']]
+    steps += [('entregadores.courier_table', lambda: metrics.courier_table(sel)),
+              ('entregadores.ratings_per_traffic', lambda: metrics.ratings_per_traffic(sel)),
+              ('entregadores.ratings_per_weather', lambda: metrics.ratings_per_weather(sel)),
+              ('entregadores.top_deliveries', lambda: metrics.top_deliveries(sel)),
+              ('restaurantes.restaurant_kpis', lambda: metrics.restaurant_kpis(sel)),
+              ('restaurantes.avg_time_delivery', lambda: restaurantes['avg_time_delivery'](sel)),
+              ('restaurantes.avg_distance_delivery', lambda: restaurantes['avg_distance_delivery'](sel)),
+              ('restaurantes.avg_time_city_traffic', lambda: restaurantes['avg_time_city_traffic'](sel)),
+              ('restaurantes.time_percentiles_city', lambda: restaurantes['time_percentiles_city'](sel)),
+              ('restaurantes.time_percentile_city_traffic', lambda: restaurantes['time_percentile_city_traffic'](sel)),
+              ('restaurantes.df_avg_std_city_order', lambda: metrics.df_avg_std_city_order(sel))]
+    return steps
+
+def measure(fn, setup = None, repeat = 3):
+    """
+    mede uma etapa: o menor tempo entre repeat execuções e o pico de memória alocada pelo
+    Python/numpy (tracemalloc) numa execução separada, para não distorcer o tempo.
+    Input: função sem argumentos, função sem argumentos (preparo antes de cada execução), Int
+    Output: Dict com seconds e peak_mb
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': round(min(times), 6), 'peak_mb': round(peak / 2**20, 3)}
+
+def measure_startup(repeat = 3):
+    """
+    mede a inicialização de cada página num processo novo: importações e definições de
+    funções, sem carregar dados (trecho antes do marcador; no Home.py, antes do
+    set_page_config). A linha 'startup[python]' é o interpretador vazio, para referência.
+    Input: Int
+    Output: lista de Dicts (rows = 0), com within_target em relação a STARTUP_TARGET_S
+    """
+    results = []
+    for page in [None] + STARTUP_PAGES:
+        code = 'pass' if page is None else STARTUP_CODE.format(root=ROOT, page=page)
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, capture_output=True)
+            times.append(time.perf_counter() - start)
+        line = {'rows': 0, 'step': 'startup[{}]'.format(page or 'python'), 'seconds': round(min(times), 6), 'peak_mb': None}
+        if page is not None:
+            line['within_target'] = line['seconds'] <= STARTUP_TARGET_S
+        results.append(line)
+    return results
+
+def run_size(rows, repeat, data_dir = DATA_DIR):
+    """
+    gera (se preciso) o csv com rows pedidos e mede todas as etapas.
+    Input: Int, Int, String
+    Output: lista de Dicts (uma linha por etapa)
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, 'train_{}.csv'.format(rows))
+    if not os.path.exists(path):
+        generate_csv(path, rows)
+
+    def cold():
+        clear_cache(path)
+        shutil.rmtree(store.store_path(path), ignore_errors=True)
+
+    raw = read_raw(path)
+    steps = [('read_raw', None, lambda: read_raw(path)),
+             ('clean_code', None, lambda: clean_code(raw.copy())),
+             ('load_data[csv]', cold, lambda: load_data(path)),
+             ('load_data[parquet]', lambda: clear_cache(path), lambda: load_data(path)),
+             ('load_data[memória]', None, lambda: load_data(path))]
+    results = [dict({'rows': rows, 'step': name}, **measure(fn, setup, repeat)) for name, setup, fn in steps]
+    raw = None
+
+    df1 = load_data(path)
+    steps = [('build_cube', lambda: build_cube(df1)),
+             ('DateIndex', lambda: DateIndex(df1)),
+             ('CourierIndex', lambda: CourierIndex(df1)),
+             ('build_time_sketch', lambda: build_time_sketch(df1)),
+             ('GridIndex[Restaurant]', lambda: GridIndex(df1, 'Restaurant')),
+             ('GridIndex[Delivery_location]', lambda: GridIndex(df1, 'Delivery_location'))]
+    steps += page_steps(path)
+    results += [dict({'rows': rows, 'step': name}, **measure(fn, None, repeat)) for name, fn in steps]
+    return results
+
+def git_commit():
+    """
+    gera o commit atual do repositório (com '+' quando há alterações não commitadas).
+    Input: None
+    Output: String ou None fora de um repositório git
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('+' if dirty else '')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mede carga, limpeza e funções das páginas em train.csv sintéticos.')
+    parser.add_argument('--rows', type=int, nargs='+', default=SIZES[:2], help='tamanhos a medir (padrão: 10000 100000)')
+    parser.add_argument('--repeat', type=int, default=3, help='execuções por etapa (vale a mais rápida)')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='onde os csv sintéticos são gerados e reaproveitados')
+    parser.add_argument('--out', help='arquivo json de saída (padrão: só imprime)')
+    args = parser.parse_args()
+
+    results = []
+    for line in measure_startup(args.repeat):
+        results.append(line)
+        print('{:>10} {:<45} {:>10.4f}s {}'.format(line['rows'], line['step'], line['seconds'],
+              {True: 'ok', False: 'acima da meta de {}s'.format(STARTUP_TARGET_S)}.get(line.get('within_target'), '')), flush=True)
+    for rows in args.rows:
+        for line in run_size(rows, args.repeat, args.data_dir):
+            results.append(line)
+            print('{rows:>10} {step:<45} {seconds:>10.4f}s {peak_mb:>10.1f} MB'.format(**line), flush=True)
+    report = {'meta': {'commit': git_commit(), 'date': dt.now().isoformat(timespec='seconds'),
+                       'workers': parallel.WORKERS,
+                       'startup_target_s': STARTUP_TARGET_S,
+                       'repeat': args.repeat, 'python': platform.python_version(), 'pandas': pd.__version__,
+                       'numpy': np.__version__, 'platform': platform.platform(),
+                       'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)},
+              'results': results}
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=1)
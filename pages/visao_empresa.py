@@ -1,165 +1,156 @@
 #Libraries
-from haversine import haversine
 import plotly.express as px
-import plotly.graph_objects as go
-import re
-from datetime import datetime as dt, date, time
+from datetime import datetime as dt
 
 #Bibliotecas necessárias
 import pandas as pd
 import streamlit as st
 import numpy as np
-import folium
-from streamlit_folium import folium_static
-from PIL import Image
+import streamlit.components.v1 as components
+from utils.assets import logo
+from utils import metrics
+from utils.data import dataset_caption, start_refresher
+from utils.date_index import load_date_index
+from utils.cache import cached, filter_state
+from utils.geo import grid_cells
+from utils.charts import resample_dates
+from utils.instrument import instrument, start_run, debug_panel
+
+#========================================
+#Mapa
+#========================================
+# Modos do mapa da Visão Geográfica: o nome exibido e o prefixo das colunas de coordenadas
+# agregadas em grade (None para o mapa original, com o centro de cada cidade por tráfego).
+MAP_MODES = {'Centro por cidade': None, 'Restaurantes': 'Restaurant', 'Locais de entrega': 'Delivery_location'}
+MAP_CELL_DEG = 0.01   # ~1 km: célula inicial da grade
+MAP_MAX_CELLS = 1000  # limite de marcadores enviados ao navegador
 
 #========================================
 #Funções
 #========================================
-def clean_code(df1):
-    """funcao criada para realizar a limpeza dos dados do arquivo train.csv
-       Limpezas realizadas:
-       #1. removendo espaços no final dos dados.
-       #2. convertendo a coluna Delivery_person_Age de str para int
-       #3. convertendo a coluna Delivery_person_Ratings de str para float
-       #4. convertendo a coluna Order_Date de str para datetime
-       #5. convertendo a coluna multiple_deliveries de str para int
-       #6. Definindo apenas números para a coluna Time_taken(min)
-       #7. Criando a coluna 'distance' com base na latitude e longitude do restaurante e entrega
-       #8. Criando a coluna 'week_of_year'
-    
-       Input: Dataframe
-       Output: Dataframe
+@instrument
+def order_by_date(sel):
     """
-    
-    #1. removendo espaços no final dos dados.
-    df1 = df1.reset_index(drop = True)
-    df1.loc[:, 'Delivery_person_Age'] = df1.loc[:, 'Delivery_person_Age'].str.strip()
-    df1.loc[:, 'multiple_deliveries'] = df1.loc[:, 'multiple_deliveries'].str.strip()
-    df1.loc[:, 'ID'] = df1.loc[:,'ID'].str.strip()
-    df1.loc[:, 'Delivery_person_ID'] = df1.loc[:, 'Delivery_person_ID'].str.strip()
-    df1.loc[:, 'Road_traffic_density'] = df1.loc[:, 'Road_traffic_density'].str.strip()
-    df1.loc[:, 'Type_of_order'] = df1.loc[:, 'Type_of_order'].str.strip()
-    df1.loc[:, 'Type_of_vehicle'] = df1.loc[:, 'Type_of_vehicle'].str.strip()
-    df1.loc[:, 'Festival'] = df1.loc[:, 'Festival'].str.strip()
-    df1.loc[:, 'City'] = df1.loc[:, 'City'].str.strip()
-    
-    #2. convertendo a coluna Age de str para int
-    df1.loc[df1['Delivery_person_Age'] != 'NaN',['Delivery_person_Age']] = df1.loc[df1['Delivery_person_Age'] != 'NaN',['Delivery_person_Age']].astype( int )
-    
-    #3. convertendo a coluna Ratings de str para float
-    df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype(float)
-    
-    #4. convertendo a coluna order_date de str para datetime
-    df1['Order_Date']=pd.to_datetime(df1['Order_Date'],format='%d-%m-%Y')
-    
-    #5. convertendo a coluna multiple_delivery de str para int
-    df1.loc[df1['multiple_deliveries'] != 'NaN',['multiple_deliveries']] = df1.loc[df1['multiple_deliveries'] != 'NaN',['multiple_deliveries']].astype( int )
-    
-    #6. Definindo apenas números para a coluna Time_taken(min)
-    df1 = df1.reset_index(drop = True)
-    # for i in range(len(df1)):
-    #   df1.loc[i, 'Time_taken(min)'] = re.findall(r'\d+', df1.loc[i, 'Time_taken(min)'])
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].apply(lambda x: x.split('(min) ')[1])
-    df1['Time_taken(min)'] =df1['Time_taken(min)'].astype(int)
-    
-    #7. Criando a coluna 'distance'
-    df1['Delivery_location_latitude'] = df1['Delivery_location_latitude'].abs()
-    df1['Delivery_location_longitude'] = df1['Delivery_location_longitude'].abs()
-    df1['Restaurant_latitude'] = df1['Restaurant_latitude'].abs()
-    df1['Restaurant_longitude'] = df1['Restaurant_longitude'].abs()
-    dist = ['Delivery_location_latitude','Delivery_location_longitude','Restaurant_latitude','Restaurant_longitude']
-    df1['distance'] = df1.loc[:, dist].apply(lambda x: haversine((x['Delivery_location_latitude'],x['Delivery_location_longitude']),(x['Restaurant_latitude'],x['Restaurant_longitude'])),axis=1)
-
-    #8. Criando a coluna 'week_of_year'
-    df1['week_of_year'] = df1['Order_Date'].dt.strftime('%U').astype(int)
-
-    return df1
-
-def order_by_date(df1, fig_title = ''):
-    """
-    gera gráfico de barras dos pedidos por dia
-    Input: DataFrame, String
+    gera gráfico de barras dos pedidos por dia; com muitos dias as barras passam a ser
+    semanais ou mensais (ver charts.resample_dates)
+    Input: Selection (metrics.Selection)
     Output: gráfico de barras
     """
-    st.markdown('##### '+fig_title)
-    df_aux = df1.loc[:, ['ID', 'Order_Date']].groupby('Order_Date').count().reset_index()
+    df_aux = metrics.orders_by_date(sel)
+    df_aux, freq = resample_dates(df_aux, 'Order_Date', ['ID'])
     fig = px.bar(df_aux, x='Order_Date', y='ID')
+    if freq != 'dia':
+        fig.update_xaxes(title_text='Order_Date (por {})'.format(freq))
     return fig 
 
-def order_by_traffic(df1, fig_title = ''):
+@instrument
+def order_by_traffic(sel):
     """
     gera gráfico de pizza dos pedidos por tipo de tráfego
-    Input: DataFrame, String
+    Input: Selection (metrics.Selection)
     Output: gráfico de pizza
     """
-    st.markdown('##### '+fig_title)
-    dfaux = df1.loc[df1['Road_traffic_density'] != 'NaN',['ID','Road_traffic_density']].groupby('Road_traffic_density').count().reset_index()
-    dfaux['entregas_perc'] = dfaux['ID'] / dfaux['ID'].sum()
+    dfaux = metrics.orders_by_traffic(sel)
     fig = px.pie(dfaux, values= 'ID', names='Road_traffic_density')
     return fig
 
-def order_by_traffic_city(df1, fig_title = ''):
+@instrument
+def order_by_traffic_city(sel):
     """
     gera gráfico de bolhas dos pedidos por tipo de tráfego e cidade
-    Input: DataFrame, String
+    Input: Selection (metrics.Selection)
     Output: gráfico de bolhas
     """
-    st.markdown('##### '+fig_title)
-    dfaux = (df1.loc[(df1['City'] != 'NaN')&(df1['Road_traffic_density'] != 'NaN'),['ID','City','Road_traffic_density']]
-                .groupby(['City','Road_traffic_density'])
-                .count()
-                .reset_index())
+    dfaux = metrics.orders_by_traffic_city(sel)
     fig = px.scatter(dfaux, x= 'City', y='Road_traffic_density', size='ID', color='City')
     return fig
 
-def order_by_week(df1, fig_title = ''):
+@instrument
+def order_by_week(sel):
     """
     gera gráfico de linha dos pedidos por semana
-    Input: DataFrame, String
+    Input: Selection (metrics.Selection)
     Output: gráfico de linha
     """
-    st.markdown('##### '+fig_title)
-    df_aux = df1.loc[:,['ID','week_of_year']].groupby('week_of_year').count().reset_index()
+    df_aux = metrics.orders_by_week(sel)
     fig = px.line(df_aux, x='week_of_year', y='ID')
     return fig
 
-def order_by_week_deliver(df1, fig_title = ''):
+@instrument
+def order_by_week_deliver(dfaux):
     """
     gera gráfico de linha da média de entregas semanais por entregador
-    Input: DataFrame, String
+    Input: DataFrame (metrics.weekly_orders_per_courier)
     Output: gráfico de linha
     """
-    st.markdown('##### '+fig_title)
-    df_pedidos = df1.loc[:, ['ID','week_of_year']].groupby('week_of_year').count().reset_index()
-    df_entregadores = df1.loc[:, ['Delivery_person_ID','week_of_year']].groupby('week_of_year').nunique().reset_index()
-    dfaux = pd.merge(df_pedidos,df_entregadores,how='inner')
-    dfaux['order_by_deliver'] = dfaux['ID'] / dfaux['Delivery_person_ID']
     fig = px.line(dfaux,x='week_of_year',y='order_by_deliver')
     return fig
 
-def country_map(df1,fig_title = ''):
+@instrument
+def location_grid(df1, point, max_cells = MAP_MAX_CELLS):
+    """
+    agrupa os pedidos numa grade regular pela localização do restaurante ou da entrega.
+    A célula começa em MAP_CELL_DEG graus e dobra até que existam no máximo max_cells
+    células com pedidos, então o mapa mostra os pontos individuais quando são poucos e
+    áreas agregadas quando são muitos. Coordenadas zeradas (não informadas) ficam de fora.
+    Input: DataFrame, String 'Restaurant' ou 'Delivery_location', Int
+    Output: DataFrame (uma linha por célula: pedidos, centro e tempo médio), Float (tamanho da célula)
     """
-    gera mapa da Localização central de cada cidade por tipo de tráfego
-    Input: DataFrame, String
-    Output: mapa
+    lat = df1[point + '_latitude'].to_numpy(dtype='float64')
+    lng = df1[point + '_longitude'].to_numpy(dtype='float64')
+    valid = (lat != 0) & (lng != 0) & ~np.isnan(lat) & ~np.isnan(lng)
+    lat, lng = lat[valid], lng[valid]
+    cell_deg = MAP_CELL_DEG
+    cells = grid_cells(lat, lng, cell_deg)
+    while len(np.unique(cells)) > max_cells:
+        cell_deg *= 2
+        cells = grid_cells(lat, lng, cell_deg)
+    df_aux = pd.DataFrame({'cell': cells, 'lat': lat, 'lng': lng,
+                           'time': df1['Time_taken(min)'].to_numpy(dtype='float64')[valid]})
+    df_aux = df_aux.groupby('cell').agg(orders=('lat', 'size'), lat=('lat', 'mean'), lng=('lng', 'mean'),
+                                        avg_time=('time', 'mean')).reset_index(drop=True)
+    return df_aux, cell_deg
+
+@instrument
+def country_map(sel, mode = 'Centro por cidade'):
     """
-    st.markdown('##### '+fig_title)
-    df_aux = df1.loc[(df1['City'] != 'NaN')&(df1['Road_traffic_density'] != 'NaN'),['City','Road_traffic_density','Delivery_location_latitude','Delivery_location_longitude']].groupby(['City','Road_traffic_density']).median().reset_index()
+    gera o html do mapa: a localização central de cada cidade por tipo de tráfego ou, nos
+    outros modos, os restaurantes / locais de entrega agregados em grade (ver location_grid),
+    com o tamanho do círculo proporcional à quantidade de pedidos.
+    O html é devolvido pronto para ser guardado por estado dos filtros e exibido sem refazer o mapa.
+    Input: Selection (metrics.Selection), String (um dos MAP_MODES)
+    Output: String (html do mapa)
+    """
+    # o folium é importado só quando a Visão Geográfica é aberta: é a importação mais
+    # lenta da página e as outras visões não precisam dele
+    import folium
     map = folium.Map()
-    for index, location_info in df_aux.iterrows():
-      folium.Marker([location_info['Delivery_location_latitude'],
-                     location_info['Delivery_location_longitude']],
-                    popup=location_info[['City','Road_traffic_density']]).add_to(map)
-    folium_static(map, width=512*1.5, height=300*1.5)    
+    if MAP_MODES[mode] is None:
+        df_aux = metrics.delivery_centers(sel)
+        for index, location_info in df_aux.iterrows():
+          folium.Marker([location_info['Delivery_location_latitude'],
+                         location_info['Delivery_location_longitude']],
+                        popup=location_info[['City','Road_traffic_density']]).add_to(map)
+    else:
+        df_aux, cell_deg = location_grid(sel.df, MAP_MODES[mode])
+        radius = 3 + 12 * np.sqrt(df_aux['orders'] / df_aux['orders'].max())
+        for lat, lng, orders, avg_time, r in zip(df_aux['lat'], df_aux['lng'], df_aux['orders'], df_aux['avg_time'], radius):
+            folium.CircleMarker([lat, lng], radius=r, weight=1, fill=True, fill_opacity=0.6,
+                                tooltip='{} pedidos - tempo médio {:.1f} min'.format(orders, avg_time)).add_to(map)
+        if len(df_aux) > 0:
+            map.fit_bounds([[df_aux['lat'].min(), df_aux['lng'].min()], [df_aux['lat'].max(), df_aux['lng'].max()]])
+    return folium.Figure().add_child(map).render()
 
 #___________________Início do código para o Streamlit__________________________________
 
-# Import
-df = pd.read_csv('train.csv')
+# Medição das etapas desta execução (só com CURRY_PROFILE=1, ver utils/instrument.py)
+start_run('visao_empresa')
+
+# Atualização do dataset em segundo plano quando o csv muda (CURRY_REFRESH_S, ver utils/data.py)
+start_refresher('train.csv')
 
-#Limpeza
-df1 = clean_code(df)
+# Import e limpeza (em cache entre reruns e sessões)
+date_index = load_date_index('train.csv')
 
 #_______________________________________________________________________________________
 #Visão empresa:
@@ -173,7 +164,7 @@ st.header('Marketplace - Visão Empresa')
 #========================================
 
 #image = Image.open(r"C:\Users\andreliziero\Documents\repos\ftc\logo.png")
-image = Image.open('logo.png')
+image = logo()
 st.sidebar.image(image, width=120)
 
 st.sidebar.markdown('# Curry Company')
@@ -182,9 +173,9 @@ st.sidebar.markdown("""---""")
 
 st.sidebar.markdown('## Selecione uma data limite')
 
-df_min = (df1.loc[df1['Order_Date'] != 'NaN', ['Order_Date']].sort_values('Order_Date', ascending= True).iloc[0,0])
-df_max = (df1.loc[df1['Order_Date'] != 'NaN', ['Order_Date']].sort_values('Order_Date', ascending= False).iloc[0,0])
-df_traffic = (df1.loc[df1['Road_traffic_density'] != 'NaN', 'Road_traffic_density'].unique())
+df_min = date_index.min_date
+df_max = date_index.max_date
+df_traffic = date_index.traffic_options
 
 date_slider = st.sidebar.slider(
     'Até qual dia?',
@@ -204,43 +195,55 @@ traffic_options = st.sidebar.multiselect(
 st.sidebar.markdown("""---""")
 
 st.sidebar.markdown('### Powered by Comunidade DS')
+st.sidebar.caption(dataset_caption('train.csv'))
 
-df1 = df1.loc[(df1['Order_Date'] <= date_slider) & (df1['Road_traffic_density'].isin(traffic_options)),:]
+sel = metrics.Selection('train.csv', date_slider, traffic_options)
 
 
 #========================================
 #Layout no Streamlit
 #========================================
 
-tab1, tab2, tab3 = st.tabs(['Visão Gerencial', 'Visão Tática', 'Visão Geográfica'])
+# st.tabs executa o corpo de todas as abas a cada rerun; com a seleção abaixo só a visão
+# escolhida é calculada, e as figuras ficam guardadas por estado dos filtros
+view = st.radio('Visão', ['Visão Gerencial', 'Visão Tática', 'Visão Geográfica'], horizontal=True, label_visibility='collapsed')
+state = filter_state(sel.snapshot, date_slider, traffic_options)
 
-with tab1:
+if view == 'Visão Gerencial':
     with st.container():
-        fig = order_by_date(df1, fig_title='Totais de Entregas Diárias')
+        st.markdown('##### Totais de Entregas Diárias')
+        fig = cached('order_by_date', state, lambda: order_by_date(sel))
         st.plotly_chart(fig, use_container_width=True)
 
     with st.container():
         col1, col2 = st.columns(2)
         with col1:
-            fig = order_by_traffic(df1,'Pedidos por tipo de tráfego')
+            st.markdown('##### Pedidos por tipo de tráfego')
+            fig = cached('order_by_traffic', state, lambda: order_by_traffic(sel))
             st.plotly_chart(fig, use_container_width=True)
 
         with col2:
-            fig = order_by_traffic_city(df1,'Pedidos por tipo de tráfego e Cidade')
+            st.markdown('##### Pedidos por tipo de tráfego e Cidade')
+            fig = cached('order_by_traffic_city', state, lambda: order_by_traffic_city(sel))
             st.plotly_chart(fig, use_container_width=True)
 
-with tab2:
+elif view == 'Visão Tática':
     st.header('Estatísticas Semanais')
     with st.container():
-        fig = order_by_week(df1, 'Pedidos por semana')
+        st.markdown('##### Pedidos por semana')
+        fig = cached('order_by_week', state, lambda: order_by_week(sel))
         st.plotly_chart(fig, use_container_width=True)
 
     with st.container():
-        fig = order_by_week_deliver(df1, 'Pedidos semanais por entregador')
+        st.markdown('##### Pedidos semanais por entregador')
+        fig = cached('order_by_week_deliver', state,
+                     lambda: order_by_week_deliver(metrics.weekly_orders_per_courier(sel)))
         st.plotly_chart(fig, use_container_width=True)
 
-with tab3:
-    country_map(df1)
-
-
+else:
+    map_mode = st.radio('Pontos no mapa', list(MAP_MODES), horizontal=True)
+    map_html = cached('country_map', (state, map_mode),
+                      lambda: country_map(sel, map_mode))
+    components.html(map_html, width=512*1.5, height=300*1.5+10)
 
+debug_panel()
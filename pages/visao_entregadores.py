@@ -1,140 +1,25 @@
 #Libraries
-from haversine import haversine
-import plotly.express as px
-import plotly.graph_objects as go
-import re
-from datetime import datetime as dt, date, time
+from datetime import datetime as dt
 
 #Bibliotecas necessárias
-import pandas as pd
 import streamlit as st
-import numpy as np
-import folium
-from streamlit_folium import folium_static
-from PIL import Image
-
-#========================================
-#Funções
-#========================================
-def clean_code(df1):
-    """funcao criada para realizar a limpeza dos dados do arquivo train.csv
-       Limpezas realizadas:
-       #1. removendo espaços no final dos dados.
-       #2. convertendo a coluna Delivery_person_Age de str para int
-       #3. convertendo a coluna Delivery_person_Ratings de str para float
-       #4. convertendo a coluna Order_Date de str para datetime
-       #5. convertendo a coluna multiple_deliveries de str para int
-       #6. Definindo apenas números para a coluna Time_taken(min)
-       #7. Criando a coluna 'distance' com base na latitude e longitude do restaurante e entrega
-       #8. Criando a coluna 'week_of_year'
-    
-       Input: Dataframe
-       Output: Dataframe
-    """
-    
-    #1. removendo espaços no final dos dados.
-    df1 = df1.reset_index(drop = True)
-    df1.loc[:, 'Delivery_person_Age'] = df1.loc[:, 'Delivery_person_Age'].str.strip()
-    df1.loc[:, 'multiple_deliveries'] = df1.loc[:, 'multiple_deliveries'].str.strip()
-    df1.loc[:, 'ID'] = df1.loc[:,'ID'].str.strip()
-    df1.loc[:, 'Delivery_person_ID'] = df1.loc[:, 'Delivery_person_ID'].str.strip()
-    df1.loc[:, 'Road_traffic_density'] = df1.loc[:, 'Road_traffic_density'].str.strip()
-    df1.loc[:, 'Type_of_order'] = df1.loc[:, 'Type_of_order'].str.strip()
-    df1.loc[:, 'Type_of_vehicle'] = df1.loc[:, 'Type_of_vehicle'].str.strip()
-    df1.loc[:, 'Festival'] = df1.loc[:, 'Festival'].str.strip()
-    df1.loc[:, 'City'] = df1.loc[:, 'City'].str.strip()
-    
-    #2. convertendo a coluna Age de str para int
-    df1.loc[df1['Delivery_person_Age'] != 'NaN',['Delivery_person_Age']] = df1.loc[df1['Delivery_person_Age'] != 'NaN',['Delivery_person_Age']].astype( int )
-    
-    #3. convertendo a coluna Ratings de str para float
-    df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype(float)
-    
-    #4. convertendo a coluna order_date de str para datetime
-    df1['Order_Date']=pd.to_datetime(df1['Order_Date'],format='%d-%m-%Y')
-    
-    #5. convertendo a coluna multiple_delivery de str para int
-    df1.loc[df1['multiple_deliveries'] != 'NaN',['multiple_deliveries']] = df1.loc[df1['multiple_deliveries'] != 'NaN',['multiple_deliveries']].astype( int )
-    
-    #6. Definindo apenas números para a coluna Time_taken(min)
-    df1 = df1.reset_index(drop = True)
-    # for i in range(len(df1)):
-    #   df1.loc[i, 'Time_taken(min)'] = re.findall(r'\d+', df1.loc[i, 'Time_taken(min)'])
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].apply(lambda x: x.split('(min) ')[1])
-    df1['Time_taken(min)'] =df1['Time_taken(min)'].astype(int)
-    
-    #7. Criando a coluna 'distance'
-    df1['Delivery_location_latitude'] = df1['Delivery_location_latitude'].abs()
-    df1['Delivery_location_longitude'] = df1['Delivery_location_longitude'].abs()
-    df1['Restaurant_latitude'] = df1['Restaurant_latitude'].abs()
-    df1['Restaurant_longitude'] = df1['Restaurant_longitude'].abs()
-    dist = ['Delivery_location_latitude','Delivery_location_longitude','Restaurant_latitude','Restaurant_longitude']
-    df1['distance'] = df1.loc[:, dist].apply(lambda x: haversine((x['Delivery_location_latitude'],x['Delivery_location_longitude']),(x['Restaurant_latitude'],x['Restaurant_longitude'])),axis=1)
-
-    #8. Criando a coluna 'week_of_year'
-    df1['week_of_year'] = df1['Order_Date'].dt.strftime('%U').astype(int)
-
-    return df1
-
-def ratings_per_traffic(df1, title = ''):
-    """
-    gera dataframe de avaliação média e desvio padrão dos entregadores por tipo de tráfego
-    Input: DataFrame, String
-    Output: DataFrame
-    """
-    st.markdown('##### '+title)
-    df_avg_std_RpR = (df1.loc[df1['Road_traffic_density'] != 'NaN',['Road_traffic_density','Delivery_person_Ratings']]
-                 .groupby('Road_traffic_density')
-                 .agg({'Delivery_person_Ratings':['mean','std']}))
-    df_avg_std_RpR.columns=['delivey_mean', 'delivery_std']
-    df_avg_std_RpR = df_avg_std_RpR.reset_index()
-    return df_avg_std_RpR
-
-def ratings_per_weather(df1, title = ''):
-    """
-    gera dataframe de avaliação média e desvio padrão dos entregadores por tipo de condição climática
-    Input: DataFrame, String
-    Output: DataFrame
-    """
-    st.markdown('##### '+title)
-    df_avg_std_RpW = (df1.loc[df1['Weatherconditions'] != 'conditions NaN',['Weatherconditions','Delivery_person_Ratings']]
-                 .groupby('Weatherconditions')
-                 .agg({'Delivery_person_Ratings':['mean','std']}))
-    df_avg_std_RpW.columns=['delivey_mean', 'delivery_std']
-    df_avg_std_RpW = df_avg_std_RpW.reset_index()    
-    return df_avg_std_RpW
-
-def top_deliveries(df1, list = 'top', title = ''):
-    """
-    gera dataframe dos top 10 entregadores mais rápidos ou mais lentos por cidade.
-    Input: DataFrame, String 'top' or 'bottom', String
-    Output: DataFrame
-    """
-    st.markdown('##### '+title)
-    if list == 'top':
-        asc = True
-    elif list == 'bottom':
-        asc = False
-        
-    df_aux = (df1.loc[df1['City'] != 'NaN',['Delivery_person_ID','City','Time_taken(min)']]
-                .groupby(['City','Delivery_person_ID'])
-                .mean()
-                .sort_values(['City','Time_taken(min)'],ascending=asc)
-                .reset_index())
-    df_top = pd.DataFrame({})
-    for city in df_aux['City'].unique():
-      df_head = df_aux.loc[df_aux['City'] == city,:].head(10)
-      df_top = pd.concat([df_top,df_head])
-    df_top.reset_index(drop=True)
-    return df_top 
+from utils.assets import logo
+from utils import metrics
+from utils.data import dataset_caption, start_refresher
+from utils.date_index import load_date_index
+from utils.cache import cached, filter_state
+from utils.instrument import start_run, debug_panel
 
 #___________________Início do código para o Streamlit__________________________________
 
-# Import
-df = pd.read_csv('train.csv')
+# Medição das etapas desta execução (só com CURRY_PROFILE=1, ver utils/instrument.py)
+start_run('visao_entregadores')
 
-#Limpeza
-df1 = clean_code(df)
+# Atualização do dataset em segundo plano quando o csv muda (CURRY_REFRESH_S, ver utils/data.py)
+start_refresher('train.csv')
+
+# Import e limpeza (em cache entre reruns e sessões)
+date_index = load_date_index('train.csv')
 
 #_______________________________________________________________________________________
 #Visão entregadores:
@@ -148,7 +33,7 @@ st.header('Marketplace - Visão Entragadores')
 #========================================
 
 #image = Image.open(r"C:\Users\andreliziero\Documents\repos\ftc\logo.png")
-image = Image.open('logo.png')
+image = logo()
 st.sidebar.image(image, width=120)
 
 st.sidebar.markdown('# Curry Company')
@@ -157,9 +42,9 @@ st.sidebar.markdown("""---""")
 
 st.sidebar.markdown('## Selecione uma data limite')
 
-df_min = (df1.loc[df1['Order_Date'] != 'NaN', ['Order_Date']].sort_values('Order_Date', ascending= True).iloc[0,0])
-df_max = (df1.loc[df1['Order_Date'] != 'NaN', ['Order_Date']].sort_values('Order_Date', ascending= False).iloc[0,0])
-df_traffic = (df1.loc[df1['Road_traffic_density'] != 'NaN', 'Road_traffic_density'].unique())
+df_min = date_index.min_date
+df_max = date_index.max_date
+df_traffic = date_index.traffic_options
 
 date_slider = st.sidebar.slider(
     'Até qual dia?',
@@ -179,8 +64,15 @@ traffic_options = st.sidebar.multiselect(
 st.sidebar.markdown("""---""")
 
 st.sidebar.markdown('### Powered by Comunidade DS')
+st.sidebar.caption(dataset_caption('train.csv'))
+
+sel = metrics.Selection('train.csv', date_slider, traffic_options)
+state = filter_state(sel.snapshot, date_slider, traffic_options)
 
-df1 = df1.loc[(df1['Order_Date'] <= date_slider) & (df1['Road_traffic_density'].isin(traffic_options)),:]
+# Colunas da tabela de avaliação por entregador que podem ser usadas na ordenação
+COURIER_SORT = {'Delivery_person_Ratings': 'Avaliação média', 'orders': 'Pedidos',
+                'avg_time': 'Tempo médio', 'Delivery_person_ID': 'Entregador'}
+COURIER_PAGE_SIZE = 25
 
 
 
@@ -194,18 +86,15 @@ with tab1:
     with st.container():
         st.title('Overall Metric')
         col1, col2, col3, col4 = st.columns(4)
+        kpis = cached('courier_kpis', state, lambda: metrics.courier_kpis(sel))
         with col1:
-            maior_idade = df1.loc[(df1['Delivery_person_Age'] != 'NaN'),['Delivery_person_Age']].max()
-            col1.metric('Entregador mais velho', maior_idade)
+            col1.metric('Entregador mais velho', kpis['max_age'])
         with col2:
-            menor_idade = df1.loc[(df1['Delivery_person_Age'] != 'NaN'),['Delivery_person_Age']].min()
-            col2.metric('Entregador mais novo', menor_idade)            
+            col2.metric('Entregador mais novo', kpis['min_age'])
         with col3:
-            melhor_veiculo = df1.loc[(df1['Vehicle_condition'] != 'NaN'),['Vehicle_condition']].max()
-            col3.metric('Melhor condição veículo', melhor_veiculo)
+            col3.metric('Melhor condição veículo', kpis['best_vehicle'])
         with col4:
-            pior_veiculo = df1.loc[(df1['Vehicle_condition'] != 'NaN'),['Vehicle_condition']].min()
-            col4.metric('Melhor condição veículo', pior_veiculo)
+            col4.metric('Melhor condição veículo', kpis['worst_vehicle'])
                 
     with st.container():
         st.markdown("""---""")
@@ -213,27 +102,57 @@ with tab1:
         col1, col2 = st.columns(2)
         with col1:
             st.markdown('##### Avaliação por entregador')
-            df1_avg_ratings_per_deliver = (df1.loc[:,['Delivery_person_ID','Delivery_person_Ratings']]
-                        .groupby('Delivery_person_ID')
-                        .mean()
-                        .sort_values('Delivery_person_Ratings',ascending=False)
-                        .reset_index())
-            st.dataframe(df1_avg_ratings_per_deliver, height = 490)
+            # tabela paginada: busca e ordenação são feitas aqui e só a página visível é enviada
+            col_search, col_sort, col_order = st.columns([2, 2, 1])
+            search = col_search.text_input('Buscar entregador', '').strip()
+            sort_by = col_sort.selectbox('Ordenar por', list(COURIER_SORT), format_func=COURIER_SORT.get)
+            ascending = col_order.selectbox('Ordem', ['Decrescente', 'Crescente']) == 'Crescente'
+            df_couriers = cached('couriers_sorted', (state, sort_by, ascending, search.lower()),
+                                 lambda: metrics.sort_couriers(cached('courier_table', state, lambda: metrics.courier_table(sel)),
+                                                               sort_by, ascending, search))
+            pages = max(-(-len(df_couriers) // COURIER_PAGE_SIZE), 1)
+            # a página volta para a primeira quando a busca ou a ordenação mudam
+            number = st.number_input('Página', min_value=1, max_value=pages, value=1, step=1,
+                                     key='courier_page:{}:{}:{}'.format(search.lower(), sort_by, ascending))
+            df_page, pages = metrics.page(df_couriers, number, COURIER_PAGE_SIZE)
+            st.dataframe(df_page, height = 490, hide_index=True)
+            st.caption('{} entregadores · página {} de {}'.format(len(df_couriers), number, pages))
     
         with col2:
             with st.container():
-                st.dataframe(ratings_per_traffic(df1, 'Avaliação média por trânsito'))
+                st.markdown('##### Avaliação média por trânsito')
+                st.dataframe(cached('ratings_per_traffic', state, lambda: metrics.ratings_per_traffic(sel)))
 
             with st.container():
-                st.dataframe(ratings_per_weather(df1, 'Avaliação média por clima'))
+                st.markdown('##### Avaliação média por clima')
+                st.dataframe(cached('ratings_per_weather', state, lambda: metrics.ratings_per_weather(sel)))
+
+    with st.container():
+        st.markdown("""---""")
+        st.title('Detalhe do entregador')
+        if len(df_page) == 0:
+            st.info('Nenhum entregador na seleção.')
+        else:
+            courier = st.selectbox('Entregador (da página da tabela)', df_page['Delivery_person_ID'].astype(str).tolist())
+            courier_kpis, df_orders = cached('courier_detail', (state, courier), lambda: metrics.courier_detail(sel, courier))
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric('Pedidos', courier_kpis['orders'])
+            col2.metric('Avaliação média', courier_kpis['avg_rating'])
+            col3.metric('Tempo médio (min)', courier_kpis['avg_time'])
+            col4.metric('Distância média (km)', courier_kpis['avg_distance'])
+            st.dataframe(df_orders, height = 300, hide_index=True)
 
     with st.container():
         st.markdown("""---""")
         st.title('Velocidade de entrega')
+        top_n = st.slider('Entregadores por cidade', min_value=1, max_value=50, value=10)
+        df_top, df_bottom = cached('top_deliveries', (state, top_n), lambda: metrics.top_deliveries(sel, top_n))
         col1, col2 = st.columns(2)
         with col1:
-            st.dataframe(top_deliveries(df1,'top','Entregadores mais rápidos'), hide_index=True)
+            st.markdown('##### Entregadores mais rápidos')
+            st.dataframe(df_top, hide_index=True)
         with col2:
-            st.dataframe(top_deliveries(df1,'bottom','Entregadores mais lentos'), hide_index=True)
-
+            st.markdown('##### Entregadores mais lentos')
+            st.dataframe(df_bottom, hide_index=True)
 
+debug_panel()
@@ -0,0 +1,152 @@
+#Libraries
+import plotly.express as px
+from datetime import datetime as dt
+
+#Bibliotecas necessárias
+import streamlit as st
+import numpy as np
+from utils.assets import logo
+from utils.data import dataset_caption, snapshot, start_refresher
+from utils.date_index import load_date_index
+from utils.spatial_index import load_grid_index
+from utils.cache import cached, filter_state
+from utils.instrument import instrument, start_run, debug_panel
+
+#========================================
+#Funções
+#========================================
+POINTS = {'Restaurantes': 'Restaurant', 'Locais de entrega': 'Delivery_location'}
+
+@instrument
+def region_metrics(df_region):
+    """
+    gera as métricas gerais dos pedidos da região: pedidos, entregadores, tempo e distância médios.
+    Input: DataFrame (pedidos da região)
+    Output: Dict
+    """
+    return {'orders': len(df_region),
+            'couriers': df_region['Delivery_person_ID'].nunique(),
+            'avg_time': np.round(df_region['Time_taken(min)'].mean(), 3),
+            'avg_dist': np.round(df_region['distance'].mean(), 3)}
+
+@instrument
+def neighborhood_map(df_cells):
+    """
+    gera gráfico de dispersão das células (bairros) da região, com o tamanho proporcional
+    aos pedidos e a cor pelo tempo médio de entrega.
+    Input: DataFrame (grid_index.cell_stats)
+    Output: gráfico de dispersão
+    """
+    fig = px.scatter(df_cells, x='longitude', y='latitude', size='pedidos', color='tempo_medio',
+                     color_continuous_scale='RdYlGn_r', hover_data=['pedidos', 'tempo_medio'])
+    fig.update_yaxes(scaleanchor='x', scaleratio=1)
+    return fig
+
+#___________________Início do código para o Streamlit__________________________________
+
+# Medição das etapas desta execução (só com CURRY_PROFILE=1, ver utils/instrument.py)
+start_run('visao_regioes')
+
+# Atualização do dataset em segundo plano quando o csv muda (CURRY_REFRESH_S, ver utils/data.py)
+start_refresher('train.csv')
+
+# Import e limpeza (em cache entre reruns e sessões); a execução inteira usa a mesma
+# versão do dataset, mesmo que o atualizador troque a versão no meio dela
+dataset = snapshot('train.csv')
+date_index = load_date_index(dataset)
+
+#_______________________________________________________________________________________
+#Visão regiões:
+
+st.set_page_config(layout='wide')
+st.header('Marketplace - Visão Regiões')
+
+
+#========================================
+#Sidebar no Streamlit
+#========================================
+
+image = logo()
+st.sidebar.image(image, width=120)
+
+st.sidebar.markdown('# Curry Company')
+st.sidebar.markdown('## Fastest Delivery in Town')
+st.sidebar.markdown("""---""")
+
+st.sidebar.markdown('## Selecione uma data limite')
+
+df_min = date_index.min_date
+df_max = date_index.max_date
+df_traffic = date_index.traffic_options
+
+date_slider = st.sidebar.slider(
+    'Até qual dia?',
+    min_value = (df_min),
+    max_value = (df_max),
+    value = (dt(int(dt.strftime(df_max,'%Y')),int(dt.strftime(df_max,'%m')),int(dt.strftime(df_max,'%d')))),
+    format = 'DD/MM/YYYY')
+
+st.sidebar.markdown("""---""")
+
+traffic_options = st.sidebar.multiselect(
+    'Defina as condições de trânsito',
+    df_traffic,
+    default = df_traffic
+)
+
+st.sidebar.markdown("""---""")
+
+st.sidebar.markdown('### Powered by Comunidade DS')
+st.sidebar.caption(dataset_caption('train.csv'))
+
+#========================================
+#Layout no Streamlit
+#========================================
+
+with st.container():
+    st.title('Busca por região')
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        point = st.radio('Localização', list(POINTS))
+    grid_index = load_grid_index(dataset, POINTS[point])
+    # o centro inicial é a célula com mais pedidos (calculada junto com o índice)
+    densest_lat, densest_lng = grid_index.densest_center
+    with col2:
+        center_lat = st.number_input('Latitude do centro', value=float(np.round(densest_lat, 4)), format='%.4f')
+    with col3:
+        center_lng = st.number_input('Longitude do centro', value=float(np.round(densest_lng, 4)), format='%.4f')
+    with col4:
+        radius_km = st.slider('Raio (km)', min_value=1, max_value=50, value=10)
+
+# a região é guardada por estado dos filtros e pelos parâmetros da busca
+region_state = (filter_state(dataset, date_slider, traffic_options), point, center_lat, center_lng, radius_km)
+positions = cached('region_positions', region_state,
+                   lambda: date_index.filter_positions(grid_index.query_radius(center_lat, center_lng, radius_km),
+                                                       date_slider, traffic_options))
+
+with st.container():
+    st.title('Overall Metric')
+    kpis = cached('region_metrics', region_state, lambda: region_metrics(date_index.df.iloc[positions]))
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        col1.metric('Pedidos na região', kpis['orders'])
+    with col2:
+        col2.metric('Entregadores', kpis['couriers'])
+    with col3:
+        col3.metric('Tempo médio de entrega', kpis['avg_time'])
+    with col4:
+        col4.metric('Distância média de entregas', kpis['avg_dist'])
+
+with st.container():
+    st.markdown("""---""")
+    df_cells = cached('region_cells', region_state, lambda: grid_index.cell_stats(positions))
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        st.markdown('##### Tempo médio de entrega por bairro')
+        fig = cached('neighborhood_map', region_state, lambda: neighborhood_map(df_cells))
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        st.markdown('##### Bairros da região')
+        st.dataframe(df_cells.sort_values('pedidos', ascending=False), height=450)
+
+debug_panel()
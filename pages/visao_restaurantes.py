@@ -1,107 +1,30 @@
 #Libraries
-from haversine import haversine
 import plotly.express as px
 import plotly.graph_objects as go
-import re
-from datetime import datetime as dt, date, time
+from datetime import datetime as dt
 
 #Bibliotecas necessárias
-import pandas as pd
 import streamlit as st
 import numpy as np
-import folium
-from streamlit_folium import folium_static
-from PIL import Image
+from utils.assets import logo
+from utils import metrics
+from utils.data import dataset_caption, start_refresher
+from utils.date_index import load_date_index
+from utils.cache import cached, filter_state
+from utils.sketch import PERCENTILE_COLUMNS
+from utils.instrument import instrument, start_run, debug_panel
 
 #========================================
 #Funções
 #========================================
-def clean_code(df1):
-    """funcao criada para realizar a limpeza dos dados do arquivo train.csv
-       Limpezas realizadas:
-       #1. removendo espaços no final dos dados.
-       #2. convertendo a coluna Delivery_person_Age de str para int
-       #3. convertendo a coluna Delivery_person_Ratings de str para float
-       #4. convertendo a coluna Order_Date de str para datetime
-       #5. convertendo a coluna multiple_deliveries de str para int
-       #6. Definindo apenas números para a coluna Time_taken(min)
-       #7. Criando a coluna 'distance' com base na latitude e longitude do restaurante e entrega
-       #8. Criando a coluna 'week_of_year'
-    
-       Input: Dataframe
-       Output: Dataframe
-    """
-    
-    #1. removendo espaços no final dos dados.
-    df1 = df1.reset_index(drop = True)
-    df1.loc[:, 'Delivery_person_Age'] = df1.loc[:, 'Delivery_person_Age'].str.strip()
-    df1.loc[:, 'multiple_deliveries'] = df1.loc[:, 'multiple_deliveries'].str.strip()
-    df1.loc[:, 'ID'] = df1.loc[:,'ID'].str.strip()
-    df1.loc[:, 'Delivery_person_ID'] = df1.loc[:, 'Delivery_person_ID'].str.strip()
-    df1.loc[:, 'Road_traffic_density'] = df1.loc[:, 'Road_traffic_density'].str.strip()
-    df1.loc[:, 'Type_of_order'] = df1.loc[:, 'Type_of_order'].str.strip()
-    df1.loc[:, 'Type_of_vehicle'] = df1.loc[:, 'Type_of_vehicle'].str.strip()
-    df1.loc[:, 'Festival'] = df1.loc[:, 'Festival'].str.strip()
-    df1.loc[:, 'City'] = df1.loc[:, 'City'].str.strip()
-    
-    #2. convertendo a coluna Age de str para int
-    df1.loc[df1['Delivery_person_Age'] != 'NaN',['Delivery_person_Age']] = df1.loc[df1['Delivery_person_Age'] != 'NaN',['Delivery_person_Age']].astype( int )
-    
-    #3. convertendo a coluna Ratings de str para float
-    df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype(float)
-    
-    #4. convertendo a coluna order_date de str para datetime
-    df1['Order_Date']=pd.to_datetime(df1['Order_Date'],format='%d-%m-%Y')
-    
-    #5. convertendo a coluna multiple_delivery de str para int
-    df1.loc[df1['multiple_deliveries'] != 'NaN',['multiple_deliveries']] = df1.loc[df1['multiple_deliveries'] != 'NaN',['multiple_deliveries']].astype( int )
-    
-    #6. Definindo apenas números para a coluna Time_taken(min)
-    df1 = df1.reset_index(drop = True)
-    # for i in range(len(df1)):
-    #   df1.loc[i, 'Time_taken(min)'] = re.findall(r'\d+', df1.loc[i, 'Time_taken(min)'])
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].apply(lambda x: x.split('(min) ')[1])
-    df1['Time_taken(min)'] =df1['Time_taken(min)'].astype(int)
-    
-    #7. Criando a coluna 'distance'
-    df1['Delivery_location_latitude'] = df1['Delivery_location_latitude'].abs()
-    df1['Delivery_location_longitude'] = df1['Delivery_location_longitude'].abs()
-    df1['Restaurant_latitude'] = df1['Restaurant_latitude'].abs()
-    df1['Restaurant_longitude'] = df1['Restaurant_longitude'].abs()
-    dist = ['Delivery_location_latitude','Delivery_location_longitude','Restaurant_latitude','Restaurant_longitude']
-    df1['distance'] = df1.loc[:, dist].apply(lambda x: haversine((x['Delivery_location_latitude'],x['Delivery_location_longitude']),(x['Restaurant_latitude'],x['Restaurant_longitude'])),axis=1)
-
-    #8. Criando a coluna 'week_of_year'
-    df1['week_of_year'] = df1['Order_Date'].dt.strftime('%U').astype(int)
-
-    return df1
-
-def avg_std_festival(df1, festival, calc):
-    """
-    gera a média ou desvio padrão das entregas durante ou fora do Festival.
-    Input: DataFrame, String 'Yes' or 'No', String 'avg_time' or 'std_time'
-    Output: Float
-    """
-    df_aux = (df1.loc[:,['Festival','Time_taken(min)','distance']]
-                .groupby('Festival')
-                .agg({'Time_taken(min)':['mean','std'],'distance':['mean','std']}))
-    df_aux.columns = ['avg_time','std_time','avg_distance','std_distance']
-    df_aux = df_aux.reset_index()
-    df_aux = np.round(df_aux.loc[df_aux['Festival'] == festival, calc],3)
-    return df_aux
-
-def avg_time_delivery(df1,title = ''):
+@instrument
+def avg_time_delivery(sel):
     """
     gera gráfico de barras com intervalo de desvio padrão do tempo médio de entregas por cidade.
-    Input: DataFrame, String
+    Input: Selection (metrics.Selection)
     Output: gráfico barras
     """
-    st.markdown('##### '+title)
-    df_aux = (df1.loc[df1['City'] != 'NaN',['City','Time_taken(min)']]
-                  .groupby('City')
-                  .agg({'Time_taken(min)':['mean','std']}))
-    df_aux.columns = ['avg_time','std_time']
-    df_aux = df_aux.reset_index()
+    df_aux = metrics.avg_time_by_city(sel)
     fig = go.Figure()
     fig.add_trace(go.Bar(name= 'Control',
                           x= df_aux['City'],
@@ -111,18 +34,14 @@ def avg_time_delivery(df1,title = ''):
     fig.update_layout(barmode='group')    
     return fig
 
-def avg_distance_delivery(df1, title = ''):
+@instrument
+def avg_distance_delivery(sel):
     """
     gera gráfico de pizza da distância média das entregas por cidade.
-    Input: DataFrame, String
+    Input: Selection (metrics.Selection)
     Output: gráfico de pizza
     """
-    st.markdown('##### '+title)
-    df_aux = (df1.loc[df1['City'] != 'NaN',['City','Time_taken(min)','distance']]
-                  .groupby('City')
-                  .agg({'Time_taken(min)':['mean','std'],'distance':['mean','std']}))
-    df_aux.columns = ['avg_time','std_time','avg_distance','std_distance']
-    avg_distance = df_aux.loc[:,'avg_distance'].reset_index()
+    avg_distance = metrics.avg_distance_by_city(sel)
     fig = go.Figure(data=[go.Pie(labels=avg_distance['City'],
                                  values=avg_distance['avg_distance'],
                                  pull=[0.02,0.02,0.02])],
@@ -133,18 +52,14 @@ def avg_distance_delivery(df1, title = ''):
                      margin = dict(t=10, l=10, r=100, b=10))    
     return fig
 
-def avg_time_city_traffic(df1, title = ''):
+@instrument
+def avg_time_city_traffic(sel):
     """
     gera gráfico de explosão solar do tempo médio das entregas por cidade e tipo de tráfego, colorido de acordo com valor do desvio padrão.
-    Input: DataFrame, String
+    Input: Selection (metrics.Selection)
     Output: gráfico de explosão solar
     """
-    st.markdown('##### '+title)
-    df_aux = (df1.loc[(df1['City'] != 'NaN')&(df1['Road_traffic_density'] != 'NaN'),['City','Road_traffic_density','Time_taken(min)','distance']]
-              .groupby(['City','Road_traffic_density'])
-              .agg({'Time_taken(min)':['mean','std'],'distance':['mean','std']}))
-    df_aux.columns = ['avg_time','std_time','avg_distance','std_distance']
-    df_aux = df_aux.reset_index()
+    df_aux = metrics.avg_time_city_traffic(sel)
     fig = px.sunburst(df_aux,
                       path=['City','Road_traffic_density'],
                       values='avg_time',
@@ -157,25 +72,40 @@ def avg_time_city_traffic(df1, title = ''):
                       margin = dict(t=0, l=0, r=10, b=0)) 
     return fig
 
-def df_avg_std_city_order(df1, title = ''):
+@instrument
+def time_percentiles_city(sel):
     """
-    gera tabela do tempo/distância médio e desvio padrão das entregas por cidade e tipo de pedido.
-    Input: DataFrame, String
-    Output: DataFrame.
+    gera gráfico de barras dos percentis (p50, p90, p99) do tempo de entrega por cidade.
+    Input: Selection (metrics.Selection)
+    Output: gráfico de barras
     """
-    st.markdown('##### '+title)
-    df_aux = df1.loc[df1['City'] != 'NaN',['City','Type_of_order','Time_taken(min)','distance']].groupby(['City','Type_of_order']).agg({'Time_taken(min)':['mean','std'],'distance':['mean','std']})
-    df_aux.columns = ['avg_time','std_time','avg_distance','std_distance']
-    df_aux = df_aux.reset_index()
-    return df_aux
+    df_aux = metrics.delivery_time_percentiles(sel, 'City')
+    df_aux = df_aux.melt(id_vars='City', value_vars=PERCENTILE_COLUMNS, var_name='percentil', value_name='Time_taken(min)')
+    fig = px.bar(df_aux, x='City', y='Time_taken(min)', color='percentil', barmode='group')
+    return fig
+
+@instrument
+def time_percentile_city_traffic(sel, percentile = 'p90'):
+    """
+    gera mapa de calor de um percentil do tempo de entrega por cidade e tipo de tráfego.
+    Input: Selection (metrics.Selection), String (uma das PERCENTILE_COLUMNS)
+    Output: mapa de calor
+    """
+    df_aux = metrics.delivery_time_percentiles(sel).pivot(index='City', columns='Road_traffic_density', values=percentile)
+    fig = px.imshow(df_aux, text_auto=True, aspect='auto', color_continuous_scale='RdYlGn_r',
+                    labels={'color': percentile + ' (min)'})
+    return fig
 
 #___________________Início do código para o Streamlit__________________________________
 
-# Import
-df = pd.read_csv('train.csv')
+# Medição das etapas desta execução (só com CURRY_PROFILE=1, ver utils/instrument.py)
+start_run('visao_restaurantes')
 
-#Limpeza
-df1 = clean_code(df)
+# Atualização do dataset em segundo plano quando o csv muda (CURRY_REFRESH_S, ver utils/data.py)
+start_refresher('train.csv')
+
+# Import e limpeza (em cache entre reruns e sessões)
+date_index = load_date_index('train.csv')
 
 #_______________________________________________________________________________________
 #Visão restaurantes:
@@ -188,7 +118,7 @@ st.header('Marketplace - Visão Restaurantes')
 #========================================
 
 #image = Image.open(r"C:\Users\andreliziero\Documents\repos\ftc\logo.png")
-image = Image.open('logo.png')
+image = logo()
 st.sidebar.image(image, width=120)
 
 st.sidebar.markdown('# Curry Company')
@@ -197,9 +127,9 @@ st.sidebar.markdown("""---""")
 
 st.sidebar.markdown('## Selecione uma data limite')
 
-df_min = (df1.loc[df1['Order_Date'] != 'NaN', ['Order_Date']].sort_values('Order_Date', ascending= True).iloc[0,0])
-df_max = (df1.loc[df1['Order_Date'] != 'NaN', ['Order_Date']].sort_values('Order_Date', ascending= False).iloc[0,0])
-df_traffic = (df1.loc[df1['Road_traffic_density'] != 'NaN', 'Road_traffic_density'].unique())
+df_min = date_index.min_date
+df_max = date_index.max_date
+df_traffic = date_index.traffic_options
 
 date_slider = st.sidebar.slider(
     'Até qual dia?',
@@ -219,8 +149,10 @@ traffic_options = st.sidebar.multiselect(
 st.sidebar.markdown("""---""")
 
 st.sidebar.markdown('### Powered by Comunidade DS')
+st.sidebar.caption(dataset_caption('train.csv'))
 
-df1 = df1.loc[(df1['Order_Date'] <= date_slider) & (df1['Road_traffic_density'].isin(traffic_options)),:]
+sel = metrics.Selection('train.csv', date_slider, traffic_options)
+state = filter_state(sel.snapshot, date_slider, traffic_options)
 
 #========================================
 #Layout no Streamlit
@@ -232,35 +164,50 @@ with tab1:
     with st.container():
         st.title('Overall Metric')
         col1,col2,col3,col4,col5,col6 = st.columns(6)
+        kpis = cached('restaurant_kpis', state, lambda: metrics.restaurant_kpis(sel))
         with col1: 
-            qnt_deliver = df1.loc[:,'Delivery_person_ID'].nunique()
-            col1.metric('Quantidade de Entregadores', qnt_deliver)
+            col1.metric('Quantidade de Entregadores', kpis['qnt_deliver'])
         with col2:
-            avg_dist = np.round(df1['distance'].mean(),3)
-            col2.metric('Distância média de entregas', avg_dist)
+            col2.metric('Distância média de entregas', kpis['avg_dist'])
         with col3:
-            col3.metric('Tempo médio de entrega durante o Festival',avg_std_festival(df1,'Yes','avg_time'))
+            col3.metric('Tempo médio de entrega durante o Festival', kpis['festival']['Yes']['avg_time'])
         with col4:
-            col4.metric('Desvio padrão de entrega durante o Festival',avg_std_festival(df1,'Yes','std_time'))
+            col4.metric('Desvio padrão de entrega durante o Festival', kpis['festival']['Yes']['std_time'])
         with col5:
-            col5.metric('Tempo médio de entrega fora do Festival',avg_std_festival(df1,'No','avg_time'))        
+            col5.metric('Tempo médio de entrega fora do Festival', kpis['festival']['No']['avg_time'])
         with col6:
-            col6.metric('Desvio padrão de entrega fora do Festival',avg_std_festival(df1,'No','std_time'))
+            col6.metric('Desvio padrão de entrega fora do Festival', kpis['festival']['No']['std_time'])
     
     with st.container():
         left,middle,right = st.columns([1,7,1])
         with middle:
-            st.plotly_chart(avg_time_delivery(df1,'Tempo Médio por Cidade'), use_container_widht=True)
+            st.markdown('##### Tempo Médio por Cidade')
+            st.plotly_chart(cached('avg_time_delivery', state, lambda: avg_time_delivery(sel)), use_container_width=True)
             
     with st.container():
         col1,col2 = st.columns(2, gap='large')        
         with col1:
-            st.plotly_chart(avg_distance_delivery(df1,'Distância Média por Cidade'), use_container_widht=True)
+            st.markdown('##### Distância Média por Cidade')
+            st.plotly_chart(cached('avg_distance_delivery', state, lambda: avg_distance_delivery(sel)), use_container_width=True)
+        with col2:
+            st.markdown('##### Tempo Médio por Cidade e Tráfego')
+            st.plotly_chart(cached('avg_time_city_traffic', state, lambda: avg_time_city_traffic(sel)), use_container_width=True)
+
+    with st.container():
+        col1,col2 = st.columns(2, gap='large')
+        with col1:
+            st.markdown('##### Percentis do Tempo por Cidade')
+            st.plotly_chart(cached('time_percentiles_city', state, lambda: time_percentiles_city(sel)), use_container_width=True)
         with col2:
-            st.plotly_chart(avg_time_city_traffic(df1, 'Tempo Médio por Cidade e Tráfego'), use_container_widht=True)
+            percentile = st.radio('Percentil', PERCENTILE_COLUMNS, index=1, horizontal=True)
+            st.markdown('##### Tempo {} por Cidade e Tráfego'.format(percentile))
+            st.plotly_chart(cached('time_percentile_city_traffic', (state, percentile),
+                                   lambda: time_percentile_city_traffic(sel, percentile)), use_container_width=True)
 
     with st.container():
         left,middle,right = st.columns([1,2.1,1])
         with middle:
-            st.dataframe(df_avg_std_city_order(df1))
+            st.dataframe(cached('df_avg_std_city_order', state, lambda: metrics.df_avg_std_city_order(sel)))
         
+
+debug_panel()
@@ -0,0 +1 @@
+# Relatórios em lote das métricas do dashboard, sem Streamlit (python -m reports.export).
@@ -0,0 +1,81 @@
+#Libraries
+import argparse
+import json
+import os
+import sys
+from datetime import datetime as dt
+
+#Bibliotecas necessárias
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import pandas as pd
+from utils import store
+from utils.data import data_version
+from utils.metrics import METRIC_NAMES, Selection, compute_all
+
+#========================================
+#Exportação das métricas
+#========================================
+# Calcula as métricas das páginas (utils/metrics.py) para um período e grava o resultado
+# sem abrir o dashboard: um metrics.json com os filtros, a versão do dataset e todas as
+# tabelas, e/ou um arquivo Parquet por métrica. Os pedidos são filtrados uma vez só e
+# todas as métricas saem do mesmo filtro.
+#    python -m reports.export --from 2022-03-01 --until 2022-03-31 --format json parquet --out relatorio_marco
+FORMATS = ('json', 'parquet')
+
+#========================================
+#Funções
+#========================================
+def as_frame(value):
+    """
+    gera a tabela de uma métrica: DataFrames ficam como estão e os Dicts de métricas gerais
+    viram uma linha, com as chaves aninhadas unidas por ponto (ex.: festival.Yes.avg_time).
+    Input: DataFrame ou Dict
+    Output: DataFrame
+    """
+    if isinstance(value, pd.DataFrame):
+        return value
+    return pd.json_normalize(value)
+
+def export(sel, out_dir, formats = FORMATS, names = None, top_n = 10):
+    """
+    calcula as métricas da seleção e grava os arquivos em out_dir.
+    Input: Selection, String, lista de formatos, lista de nomes de métricas, Int
+    Output: lista de Strings (arquivos gravados)
+    """
+    results = {name: as_frame(value) for name, value in compute_all(sel, names, top_n).items()}
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    if 'json' in formats:
+        meta = dict(sel.filters(), data_version=data_version(sel.snapshot), top_n=top_n,
+                    date=dt.now().isoformat(timespec='seconds'))
+        report = {'meta': json.loads(json.dumps(meta, default=str)),
+                  'metrics': {name: json.loads(df.to_json(orient='records', date_format='iso')) for name, df in results.items()}}
+        path = os.path.join(out_dir, 'metrics.json')
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=1, ensure_ascii=False)
+        written.append(path)
+    if 'parquet' in formats:
+        for name, df in results.items():
+            path = os.path.join(out_dir, name + '.parquet')
+            df.to_parquet(path, index=False)
+            written.append(path)
+    return written
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Grava as métricas do dashboard de um período em json/Parquet, sem Streamlit.')
+    parser.add_argument('--csv', default='train.csv', help='csv dos pedidos (padrão: train.csv)')
+    parser.add_argument('--from', dest='date_from', help='data inicial AAAA-MM-DD (padrão: primeiro dia do csv)')
+    parser.add_argument('--until', dest='date_until', help='data limite AAAA-MM-DD (padrão: último dia do csv)')
+    parser.add_argument('--traffic', nargs='+', help='condições de trânsito (padrão: todas)')
+    parser.add_argument('--metrics', nargs='+', choices=METRIC_NAMES, help='métricas a calcular (padrão: todas)')
+    parser.add_argument('--top', type=int, default=10, help='entregadores por cidade em fastest/slowest_deliveries')
+    parser.add_argument('--format', nargs='+', default=['json'], choices=FORMATS, help='formatos de saída (padrão: json)')
+    parser.add_argument('--out', default='reports/out', help='diretório de saída')
+    args = parser.parse_args()
+    if 'parquet' in args.format and not store.available():
+        parser.error('o formato parquet precisa do pyarrow')
+
+    sel = Selection(args.csv, args.date_until, args.traffic, args.date_from)
+    for path in export(sel, args.out, args.format, args.metrics, args.top):
+        print(path)
@@ -0,0 +1,43 @@
+#Libraries
+import os
+import sys
+
+# sem atualizador em segundo plano nos testes (ver data.start_refresher); precisa vir
+# antes do import de utils.data, que lê CURRY_REFRESH_S
+os.environ.setdefault('CURRY_REFRESH_S', '0')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+#Bibliotecas necessárias
+import pytest
+from bench.generate import generate_csv
+from utils import cache, data
+
+#========================================
+#Fixtures
+#========================================
+ROWS = 3000
+
+@pytest.fixture(scope='session')
+def sample_csv(tmp_path_factory):
+    """
+    train.csv sintético (bench/generate.py), gerado uma vez por execução dos testes.
+    """
+    return generate_csv(str(tmp_path_factory.mktemp('sample') / 'train.csv'), ROWS, seed=7)
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch, sample_csv):
+    """
+    diretório temporário com cópias do train.csv e do logo.png, como diretório atual (as
+    páginas abrem os dois pelo caminho relativo), e os caches em memória vazios.
+    """
+    for src, name in ((sample_csv, 'train.csv'), (os.path.join(ROOT, 'logo.png'), 'logo.png')):
+        with open(src, 'rb') as f_src, open(tmp_path / name, 'wb') as f_dst:
+            f_dst.write(f_src.read())
+    monkeypatch.chdir(tmp_path)
+    data.clear_cache()
+    cache.clear()
+    yield tmp_path
+    data.clear_cache()
+    cache.clear()
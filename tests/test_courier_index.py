@@ -0,0 +1,74 @@
+#Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+import pytest
+from utils import metrics
+from utils.courier_index import MEAN_DECIMALS
+
+#========================================
+#Funções auxiliares
+#========================================
+def groupby_table(sel):
+    """
+    tabela por entregador calculada direto nos pedidos filtrados (médias em float64, com as
+    casas decimais do índice), para comparar com o índice.
+    """
+    df_aux = sel.df.astype({'Delivery_person_Ratings': 'float64', 'Time_taken(min)': 'float64'})
+    return (df_aux.groupby('Delivery_person_ID', observed=True)
+                  .agg(orders=('ID', 'count'), Delivery_person_Ratings=('Delivery_person_Ratings', 'mean'),
+                       avg_time=('Time_taken(min)', 'mean'))
+                  .round({'Delivery_person_Ratings': MEAN_DECIMALS, 'avg_time': MEAN_DECIMALS})
+                  .reset_index())
+
+FILTERS = [{},
+           {'date_until': '2022-03-10', 'traffic_options': ['Low', 'Jam']},
+           {'date_from': '2022-02-25', 'date_until': '2022-03-20', 'traffic_options': ['High', 'Medium']}]
+
+#========================================
+#Índice por entregador
+#========================================
+@pytest.mark.parametrize('filters', FILTERS)
+@pytest.mark.parametrize('sort_by, ascending', [('Delivery_person_Ratings', False), ('orders', True),
+                                                ('avg_time', False), ('Delivery_person_ID', True)])
+def test_pages_match_groupby(workdir, filters, sort_by, ascending):
+    sel = metrics.Selection('train.csv', **filters)
+    expected = groupby_table(sel)
+    expected = (expected.sort_values('Delivery_person_ID', kind='stable')
+                        .sort_values(sort_by, ascending=ascending, kind='stable', na_position='last')
+                        .reset_index(drop=True))
+    df_sorted = metrics.sort_couriers(metrics.courier_table(sel), sort_by, ascending)
+    size = 25
+    df_page, pages = metrics.page(df_sorted, 1, size)
+    assert pages == max(-(-len(expected) // size), 1)
+    for number in range(1, pages + 1):
+        df_page, _ = metrics.page(df_sorted, number, size)
+        df_expected = expected.iloc[(number - 1) * size:number * size]
+        assert df_page['Delivery_person_ID'].astype(str).tolist() == df_expected['Delivery_person_ID'].astype(str).tolist()
+        assert df_page['orders'].tolist() == df_expected['orders'].tolist()
+        np.testing.assert_allclose(df_page['Delivery_person_Ratings'], df_expected['Delivery_person_Ratings'], rtol=1e-6)
+        np.testing.assert_allclose(df_page['avg_time'], df_expected['avg_time'], rtol=1e-9)
+
+def test_search_and_page_bounds(workdir):
+    sel = metrics.Selection('train.csv')
+    df_couriers = metrics.courier_table(sel)
+    df_found = metrics.sort_couriers(df_couriers, 'orders', False, ' bangRES ')
+    expected = df_couriers['Delivery_person_ID'].astype(str).str.lower().str.contains('bangres')
+    assert sorted(df_found['Delivery_person_ID'].astype(str)) == sorted(df_couriers.loc[expected, 'Delivery_person_ID'].astype(str))
+    # páginas fora do intervalo ficam na primeira / na última
+    last, pages = metrics.page(df_found, 10**6, 10)
+    assert last.equals(metrics.page(df_found, pages, 10)[0])
+    assert metrics.page(df_found, 0, 10)[0].equals(df_found.iloc[:10])
+    assert metrics.page(df_found.iloc[:0], 1, 10)[1] == 1
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_drill_down_matches_orders(workdir, filters):
+    sel = metrics.Selection('train.csv', **filters)
+    couriers = groupby_table(sel)['Delivery_person_ID'].astype(str)
+    for courier in couriers.iloc[::max(len(couriers) // 10, 1)]:
+        kpis, df_orders = metrics.courier_detail(sel, courier)
+        df_expected = sel.df.loc[sel.df['Delivery_person_ID'] == courier]
+        assert kpis['orders'] == len(df_expected)
+        pd.testing.assert_frame_equal(df_orders, df_expected[df_orders.columns].reset_index(drop=True))
+        assert kpis['avg_time'] == np.round(df_expected['Time_taken(min)'].mean(), 1)
+    kpis, df_orders = metrics.courier_detail(sel, 'NO_SUCH_COURIER')
+    assert kpis['orders'] == 0 and len(df_orders) == 0
@@ -0,0 +1,58 @@
+#Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+import pytest
+from utils.data import CATEGORY_COLUMNS, clean_code, read_raw
+
+#========================================
+#Funções auxiliares
+#========================================
+def baseline_clean_code(df1):
+    """
+    limpeza original das páginas (antes do read_raw tipado): strip linha a linha e
+    distância com o pacote haversine aplicado por linha. A idade e as entregas múltiplas
+    ficam como texto e são comparadas com pd.to_numeric.
+    """
+    from haversine import haversine
+    df1 = df1.reset_index(drop = True)
+    for col in ['Delivery_person_Age', 'multiple_deliveries', 'ID', 'Delivery_person_ID', 'Road_traffic_density',
+                'Type_of_order', 'Type_of_vehicle', 'Festival', 'City']:
+        df1.loc[:, col] = df1.loc[:, col].str.strip()
+    df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype(float)
+    df1['Order_Date'] = pd.to_datetime(df1['Order_Date'], format='%d-%m-%Y')
+    df1['Time_taken(min)'] = df1['Time_taken(min)'].apply(lambda x: x.split('(min) ')[1]).astype(int)
+    dist = ['Delivery_location_latitude','Delivery_location_longitude','Restaurant_latitude','Restaurant_longitude']
+    df1[dist] = df1[dist].abs()
+    df1['distance'] = df1.loc[:, dist].apply(lambda x: haversine((x['Delivery_location_latitude'],x['Delivery_location_longitude']),(x['Restaurant_latitude'],x['Restaurant_longitude'])),axis=1)
+    df1['week_of_year'] = df1['Order_Date'].dt.strftime('%U').astype(int)
+    return df1
+
+def as_text(s):
+    """
+    texto de uma coluna limpa, com o 'NaN' do csv como valor ausente.
+    """
+    s = s.astype(object).where(s.notna(), None)
+    return s.where(s != 'NaN', None)
+
+#========================================
+#Limpeza do train.csv
+#========================================
+def test_clean_code_matches_baseline(workdir):
+    pytest.importorskip('haversine')
+    df1 = clean_code(read_raw('train.csv'))
+    expected = baseline_clean_code(pd.read_csv('train.csv'))
+    assert list(df1.columns) == list(expected.columns)
+
+    # texto: o clima também perde o prefixo 'conditions', e os horários, os espaços
+    expected['Weatherconditions'] = expected['Weatherconditions'].str.replace('conditions', '').str.strip()
+    for col in ['ID'] + CATEGORY_COLUMNS:
+        assert as_text(df1[col]).equals(as_text(expected[col].str.strip())), col
+    for col in ['Delivery_person_Age', 'multiple_deliveries']:
+        pd.testing.assert_series_equal(df1[col].astype('float64'), pd.to_numeric(expected[col], errors='coerce'), check_names=False)
+    for col in ['Order_Date', 'Time_taken(min)', 'week_of_year', 'Vehicle_condition']:
+        assert (df1[col].to_numpy() == expected[col].to_numpy()).all(), col
+    # decimais em float32 e a distância vetorizada: iguais ao original na precisão do float32
+    for col in ['Delivery_person_Ratings', 'Restaurant_latitude', 'Restaurant_longitude',
+                'Delivery_location_latitude', 'Delivery_location_longitude', 'distance']:
+        np.testing.assert_allclose(df1[col].to_numpy(dtype='float64'), expected[col].to_numpy(dtype='float64'),
+                                   rtol=1e-6, atol=1e-4, err_msg=col)
@@ -0,0 +1,68 @@
+#Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+import pytest
+from utils import metrics
+
+#========================================
+#Funções auxiliares
+#========================================
+MEASURES = {'ratings': 'Delivery_person_Ratings', 'time': 'Time_taken(min)', 'distance': 'distance'}
+
+def groupby_avg_std(sel, by, measures):
+    """
+    média e desvio padrão por grupo calculados direto nos pedidos filtrados (float64), com
+    os nomes de coluna do cubo (avg_<medida>, std_<medida>).
+    """
+    df_aux = sel.df.astype({MEASURES[m]: 'float64' for m in measures})
+    df_aux = df_aux.groupby(by, observed=True)[[MEASURES[m] for m in measures]].agg(['mean', 'std'])
+    df_aux.columns = ['{}_{}'.format(stat.replace('mean', 'avg'), m) for m in measures for stat in ('mean', 'std')]
+    return df_aux
+
+FILTERS = [{},
+           {'date_until': '2022-03-15', 'traffic_options': ['Low', 'Jam']},
+           {'date_from': '2022-02-20', 'date_until': '2022-03-01', 'traffic_options': ['High']}]
+
+#========================================
+#Visão Empresa
+#========================================
+def test_weekly_orders_per_courier_is_exact(workdir):
+    sel = metrics.Selection('train.csv', date_until='2022-03-20', traffic_options=['Low', 'Medium', 'Jam'])
+    result = metrics.weekly_orders_per_courier(sel).set_index('week_of_year')
+    expected = sel.df.groupby('week_of_year').agg(ID=('ID', 'count'), Delivery_person_ID=('Delivery_person_ID', 'nunique'))
+    assert (result['ID'] == expected['ID']).all()
+    assert (result['Delivery_person_ID'] == expected['Delivery_person_ID']).all()
+
+#========================================
+#Métricas do cubo diário
+#========================================
+@pytest.mark.parametrize('filters', FILTERS)
+def test_cube_metrics_match_groupby(workdir, filters):
+    sel = metrics.Selection('train.csv', **filters)
+    cases = [(metrics.avg_time_by_city, ['City'], ['time']),
+             (metrics.avg_distance_by_city, ['City'], ['distance']),
+             (metrics.avg_time_city_traffic, ['City', 'Road_traffic_density'], ['time', 'distance']),
+             (metrics.df_avg_std_city_order, ['City', 'Type_of_order'], ['time', 'distance'])]
+    for metric, by, measures in cases:
+        expected = groupby_avg_std(sel, by, measures)
+        result = metric(sel).set_index(by)[expected.columns]
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_categorical=False,
+                                      check_index_type=False, rtol=1e-6)
+
+    for metric, by in ((metrics.ratings_per_traffic, 'Road_traffic_density'), (metrics.ratings_per_weather, 'Weatherconditions')):
+        expected = groupby_avg_std(sel, [by], ['ratings'])
+        result = metric(sel).set_index(by)
+        np.testing.assert_allclose(result['delivey_mean'], expected['avg_ratings'], rtol=1e-6)
+        np.testing.assert_allclose(result['delivery_std'], expected['std_ratings'], rtol=1e-6)
+
+    expected = sel.df.groupby('Road_traffic_density', observed=True)['ID'].count()
+    result = metrics.orders_by_traffic(sel).set_index('Road_traffic_density')['ID']
+    assert result.to_dict() == expected.to_dict()
+
+    kpis = metrics.restaurant_kpis(sel)
+    expected = groupby_avg_std(sel, ['Festival'], ['time'])
+    for fest in ('Yes', 'No'):
+        for calc in ('avg_time', 'std_time'):
+            value = expected.loc[fest, calc] if fest in expected.index else np.nan
+            assert kpis['festival'][fest][calc] == pytest.approx(np.round(value, 3), abs=1e-3, nan_ok=True)
+    assert kpis['avg_dist'] == pytest.approx(np.round(sel.df['distance'].astype('float64').mean(), 3), abs=1e-3)
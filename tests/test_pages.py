@@ -0,0 +1,34 @@
+#Libraries
+import os
+import subprocess
+import sys
+
+#Bibliotecas necessárias
+import pytest
+from conftest import ROOT
+from utils import metrics
+
+#========================================
+#Visão Entregadores
+#========================================
+def test_courier_kpis_empty_selection(workdir):
+    kpis = metrics.courier_kpis(metrics.Selection('train.csv', traffic_options=[]))
+    assert kpis == {'max_age': None, 'min_age': None, 'best_vehicle': None, 'worst_vehicle': None}
+
+def test_entregadores_page_without_traffic(workdir):
+    testing = pytest.importorskip('streamlit.testing.v1')
+    at = testing.AppTest.from_file(os.path.join(ROOT, 'pages', 'visao_entregadores.py'), default_timeout=60)
+    at.run()
+    assert not at.exception
+    at.multiselect[0].set_value([]).run()
+    assert not at.exception
+    assert [metric.value for metric in at.metric[:4]] == ['—'] * 4
+
+#========================================
+#Abertura das páginas
+#========================================
+def test_metrics_import_is_lazy():
+    # o pyarrow.parquet só é importado quando o cache em disco é usado
+    code = 'import sys, utils.metrics; print("pyarrow.parquet" in sys.modules)'
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert out.strip() == 'False'
@@ -0,0 +1,53 @@
+#Libraries
+import multiprocessing
+import os
+
+#Bibliotecas necessárias
+import pandas as pd
+import pytest
+from utils import data, parallel, store
+
+#========================================
+#Funções auxiliares
+#========================================
+def crash_in_worker(value):
+    """
+    tarefa que derruba o processo do pool em que roda (no processo principal só devolve o dobro).
+    """
+    if multiprocessing.parent_process() is not None:
+        os._exit(1)
+    return value * 2
+
+@pytest.fixture
+def workers(monkeypatch):
+    """
+    pool com 2 processos durante o teste, encerrado no fim.
+    """
+    monkeypatch.setattr(parallel, 'WORKERS', 2)
+    yield 2
+    parallel.shutdown()
+
+#========================================
+#Limpeza em paralelo e em pedaços
+#========================================
+def test_parallel_clean_matches_serial(workdir, workers):
+    expected = data.clean_code(data.read_raw('train.csv'))
+    parts = list(data.iter_clean_parallel('train.csv'))
+    assert len(parts) >= workers and parallel._pool is not None
+    pd.testing.assert_frame_equal(data.concat_clean(parts), expected)
+
+def test_chunked_build_entry_matches_serial(workdir):
+    if not store.available():
+        pytest.skip('pyarrow não instalado')
+    expected = data.clean_code(data.read_raw('train.csv')).sort_values('Order_Date', kind='mergesort', ignore_index=True)
+    entry = data.build_entry('train.csv', data.file_stat('train.csv'), chunksize=500)
+    # um grupo de linhas do Parquet por pedaço limpo
+    manifest = store.read_manifest('train.csv')
+    pq = store.arrow()[1]
+    assert pq.ParquetFile(os.path.join(store.store_path('train.csv'), manifest['parts'][0])).num_row_groups > 1
+    pd.testing.assert_frame_equal(entry['df'], expected)
+
+def test_pool_falls_back_to_serial(workers):
+    # os processos do pool morrem: as tarefas que faltam são feitas no próprio processo
+    assert list(parallel.pool_map(crash_in_worker, [(i,) for i in range(6)])) == [0, 2, 4, 6, 8, 10]
+    assert parallel._pool is None
@@ -0,0 +1,116 @@
+#Bibliotecas necessárias
+import os
+import threading
+
+import pandas as pd
+from bench.generate import generate_chunk
+from utils import data, metrics
+from utils.cache import filter_state
+
+#========================================
+#Funções auxiliares
+#========================================
+def append_orders(path, rows, seed, **kwargs):
+    """
+    acrescenta rows pedidos sintéticos ao final do csv (por padrão nas datas do csv
+    original; start e days do generate_chunk mudam o período).
+    """
+    with open(path, 'a', newline='') as f:
+        generate_chunk(rows, seed=seed, first_id=10**6 + seed * rows, **kwargs).to_csv(f, index=False, header=False)
+
+#========================================
+#Espera do csv parar de mudar
+#========================================
+def test_refresh_waits_for_settled_csv(workdir):
+    df_old = data.load_data('train.csv')
+    append_orders('train.csv', 100, seed=3)
+    # primeira conferência depois da mudança: o csv pode ainda estar sendo gravado
+    assert not data.refresh('train.csv', settle=True)
+    assert data._cache[os.path.abspath('train.csv')]['df'] is df_old
+    append_orders('train.csv', 100, seed=4)
+    assert not data.refresh('train.csv', settle=True)
+    # sem mudança desde a conferência anterior: a versão nova entra
+    assert data.refresh('train.csv', settle=True)
+    assert len(data._cache[os.path.abspath('train.csv')]['df']) == len(df_old) + 200
+
+#========================================
+#Pedidos acrescentados ao csv
+#========================================
+def test_newer_orders_merge_derived(workdir):
+    df_old = data.load_data('train.csv')
+    built = []
+    def count_rows(df1):
+        built.append(len(df1))
+        return len(df1)
+    assert data.load_derived('train.csv', 'rows', count_rows, lambda old, new: old + new) == len(df_old)
+
+    # pedidos de vários dias, todos depois do fim do csv e fora de ordem entre si
+    append_orders('train.csv', 300, seed=6, start='2022-04-10', days=5)
+    assert data.refresh('train.csv')
+    df1 = data.load_data('train.csv')
+    assert df1['Order_Date'].is_monotonic_increasing
+    pd.testing.assert_frame_equal(df1.iloc[:len(df_old)], df_old, check_categorical=False)
+    # o agregado só recebeu as linhas novas
+    assert data.load_derived('train.csv', 'rows', count_rows, lambda old, new: old + new) == len(df_old) + 300
+    assert built == [len(df_old), 300]
+
+    # pedidos com datas dentro do período já carregado: reordenação e agregado refeito
+    append_orders('train.csv', 100, seed=7)
+    assert data.refresh('train.csv')
+    df1 = data.load_data('train.csv')
+    assert df1['Order_Date'].is_monotonic_increasing
+    assert data.load_derived('train.csv', 'rows', count_rows, lambda old, new: old + new) == len(df_old) + 400
+    assert built == [len(df_old), 300, len(df_old) + 400]
+
+#========================================
+#Agregados calculados fora do lock
+#========================================
+def test_derived_build_does_not_block_load_data(workdir):
+    rows = len(data.load_data('train.csv'))
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_build(df1):
+        calls.append(1)
+        started.set()
+        release.wait(10)
+        return len(df1)
+
+    threads = [threading.Thread(target=data.load_derived, args=('train.csv', 'slow', slow_build)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    assert started.wait(10)
+    # enquanto o agregado é calculado, o DataFrame e os outros agregados continuam disponíveis
+    result = []
+    reader = threading.Thread(target=lambda: result.append(data.load_derived('train.csv', 'fast', len)))
+    reader.start()
+    reader.join(5)
+    assert result == [rows]
+    release.set()
+    for thread in threads:
+        thread.join(10)
+    # as sessões que esperavam usam o agregado calculado pela primeira
+    assert len(calls) == 1
+
+#========================================
+#Seleção presa a uma versão do dataset
+#========================================
+def test_selection_keeps_its_dataset_version(workdir):
+    filters = {'date_until': '2022-03-20', 'traffic_options': ['Low', 'Medium', 'Jam']}
+    sel = metrics.Selection('train.csv', **filters)
+    old = dict(sel.snapshot, derived={})
+    append_orders('train.csv', 400, seed=5)
+    # a versão é trocada depois da criação da seleção e antes das métricas
+    assert data.refresh('train.csv')
+    assert data.data_version('train.csv') != data.data_version(old)
+    assert filter_state(sel.snapshot, sel.date_until, sel.traffic_options)[0] == data.data_version(old)
+
+    result = metrics.compute_all(sel)
+    expected = metrics.compute_all(metrics.Selection(old, **filters))
+    assert not metrics.courier_table(metrics.Selection('train.csv', **filters)).equals(expected['courier_table'])
+    assert result.keys() == expected.keys()
+    for name in expected:
+        if isinstance(expected[name], pd.DataFrame):
+            pd.testing.assert_frame_equal(result[name], expected[name])
+        else:
+            assert result[name] == expected[name]
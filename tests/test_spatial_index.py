@@ -0,0 +1,13 @@
+#Bibliotecas necessárias
+import pytest
+from utils.spatial_index import load_grid_index
+
+#========================================
+#Índice espacial
+#========================================
+@pytest.mark.parametrize('point', ['Restaurant', 'Delivery_location'])
+def test_densest_center_matches_cell_stats(workdir, point):
+    grid_index = load_grid_index('train.csv', point)
+    df_cells = grid_index.cell_stats()
+    densest = df_cells.loc[df_cells['pedidos'].idxmax()]
+    assert grid_index.densest_center == pytest.approx((densest['latitude'], densest['longitude']), abs=1e-9)
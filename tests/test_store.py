@@ -0,0 +1,29 @@
+#Bibliotecas necessárias
+import os
+
+import pandas as pd
+import pytest
+from test_refresh import append_orders
+from utils import data, store
+
+pytestmark = pytest.mark.skipif(not store.available(), reason='pyarrow não instalado')
+
+#========================================
+#Cache em disco
+#========================================
+def test_appended_store_reloads_like_fresh_build(workdir):
+    data.load_data('train.csv')
+    for i in range(store.MAX_PARTS + 2):
+        append_orders('train.csv', 50, seed=10 + i)
+        data.load_data('train.csv')
+        manifest = store.read_manifest('train.csv')
+        # as partes pequenas das cargas incrementais são juntadas acima de MAX_PARTS
+        assert 1 <= len(manifest['parts']) <= store.MAX_PARTS
+        files = [name for name in os.listdir(store.store_path('train.csv')) if name.endswith('.parquet')]
+        assert sorted(files) == sorted(manifest['parts'])
+
+    data.clear_cache()
+    df_store = data.load_data('train.csv')
+    assert len(store.read_manifest('train.csv')['parts']) < store.MAX_PARTS
+    fresh = data.clean_code(data.read_raw('train.csv')).sort_values('Order_Date', kind='mergesort', ignore_index=True)
+    pd.testing.assert_frame_equal(df_store, fresh)
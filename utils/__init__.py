@@ -0,0 +1 @@
+# Módulos compartilhados entre o Home.py e as páginas do dashboard.
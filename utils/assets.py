@@ -0,0 +1,16 @@
+#Libraries
+import functools
+
+#========================================
+#Arquivos estáticos
+#========================================
+@functools.lru_cache(maxsize=None)
+def logo(path = 'logo.png'):
+    """
+    gera o conteúdo do logo, lido do disco uma vez por processo. Os bytes vão direto para o
+    st.sidebar.image, sem abrir a imagem com o PIL a cada rerun de cada página.
+    Input: String
+    Output: bytes
+    """
+    with open(path, 'rb') as f:
+        return f.read()
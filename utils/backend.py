@@ -0,0 +1,44 @@
+#Bibliotecas necessárias
+from utils.cube import load_cube, filter_cube, cube_orders, cube_avg_std
+from utils.instrument import instrument
+
+#========================================
+#Consultas agregadas
+#========================================
+# Os agregados das páginas (pedidos por grupo, média e desvio padrão das medidas) são
+# pedidos a um objeto de consulta com os filtros da barra lateral já aplicados, respondido
+# pelo cubo diário em memória (utils/cube.py).
+class CubeQuery:
+    """
+    consultas agregadas: o cubo diário em memória filtrado pela barra lateral.
+    """
+
+    def __init__(self, path, date_until, traffic_options, date_from = None):
+        self.cube = filter_cube(load_cube(path), date_until, traffic_options, date_from)
+
+    @instrument
+    def orders(self, by):
+        """
+        gera a quantidade de pedidos por grupo (coluna 'orders').
+        Input: String ou lista de Strings
+        Output: DataFrame
+        """
+        return cube_orders(self.cube, by)
+
+    @instrument
+    def avg_std(self, by, measures):
+        """
+        gera média e desvio padrão por grupo das medidas (colunas avg_<medida> e std_<medida>).
+        Input: String ou lista de Strings ([] para o total), lista de medidas
+        Output: DataFrame
+        """
+        return cube_avg_std(self.cube, by, measures)
+
+def open_query(path, date_until, traffic_options, date_from = None):
+    """
+    abre as consultas do dataset do csv com os filtros da barra lateral.
+    date_from (opcional) limita também o início do período, para relatórios por intervalo.
+    Input: String (ou entrada, ver data.snapshot), datetime, lista de Strings, datetime
+    Output: CubeQuery
+    """
+    return CubeQuery(path, date_until, traffic_options, date_from)
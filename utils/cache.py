@@ -0,0 +1,134 @@
+#Libraries
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+
+#Bibliotecas necessárias
+import pandas as pd
+from utils.data import data_version
+
+#========================================
+#Cache de resultados
+#========================================
+# Resultados calculados a partir dos filtros da barra lateral (métricas, tabelas, figuras e
+# html do mapa), guardados no processo e compartilhados entre sessões, com a chave
+# (nome, estado dos filtros) - o estado já inclui a versão do dataset (ver filter_state).
+# O total guardado é limitado por MAX_BYTES (CURRY_CACHE_MB, padrão 256 MB) e por
+# MAX_ENTRIES: acima disso os resultados usados há mais tempo são descartados.
+# Quando várias sessões pedem o mesmo resultado ao mesmo tempo, só a primeira calcula e
+# as outras esperam por ele. Os contadores (stats) ficam no log de desempenho e no painel
+# de depuração (ver utils/instrument.py).
+MAX_ENTRIES = 512
+MAX_BYTES = int(float(os.environ.get('CURRY_CACHE_MB', '256')) * 2**20)
+
+_results = OrderedDict()   # chave -> (resultado, bytes)
+_pending = {}              # chave -> threading.Event das chaves sendo calculadas
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'bytes': 0}
+
+#========================================
+#Funções
+#========================================
+def filter_state(path, date_until, traffic_options):
+    """
+    gera a chave do estado dos filtros: versão do dataset, data limite e condições de trânsito.
+    Com a entrada da Selection (sel.snapshot), a versão é a dos dados usados nos resultados.
+    Input: String (ou entrada, ver data.snapshot), datetime, lista de Strings
+    Output: Tupla
+    """
+    return (data_version(path), pd.Timestamp(date_until), tuple(sorted(traffic_options)))
+
+def sizeof(value):
+    """
+    gera o tamanho aproximado em bytes de um resultado: memória dos DataFrames/Series,
+    tamanho do texto, soma dos itens de Dicts/listas e, para os demais objetos (ex.:
+    figuras do plotly), o tamanho serializado com pickle.
+    Input: objeto
+    Output: Int
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(key) + sizeof(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+def _store(full_key, value, size):
+    """
+    guarda um resultado e descarta os usados há mais tempo até caber no orçamento.
+    Resultados maiores que o orçamento inteiro não são guardados. Chamar com _lock.
+    Input: chave, resultado, Int (sizeof do resultado)
+    Output: None
+    """
+    if size > MAX_BYTES:
+        return
+    if full_key in _results:
+        _stats['bytes'] -= _results.pop(full_key)[1]
+    _results[full_key] = (value, size)
+    _stats['bytes'] += size
+    while len(_results) > MAX_ENTRIES or _stats['bytes'] > MAX_BYTES:
+        _stats['bytes'] -= _results.popitem(last=False)[1][1]
+        _stats['evictions'] += 1
+
+def cached(name, key, compute):
+    """
+    devolve o resultado de compute() para (name, key), calculado só na primeira vez.
+    Input: String (nome do resultado), chave (ex.: filter_state), função sem argumentos
+    Output: resultado de compute()
+    """
+    full_key = (name, key)
+    while True:
+        with _lock:
+            if full_key in _results:
+                _results.move_to_end(full_key)
+                _stats['hits'] += 1
+                return _results[full_key][0]
+            event = _pending.get(full_key)
+            if event is None:
+                _stats['misses'] += 1
+                event = _pending[full_key] = threading.Event()
+                break
+        # outra sessão está calculando o mesmo resultado: espera e confere de novo
+        event.wait()
+
+    try:
+        value = compute()
+        size = sizeof(value)
+        with _lock:
+            _store(full_key, value, size)
+        return value
+    finally:
+        with _lock:
+            del _pending[full_key]
+        event.set()
+
+def stats():
+    """
+    gera os contadores do cache: acertos, faltas, descartes, entradas, bytes guardados e o
+    orçamento, para monitoramento.
+    Input: None
+    Output: Dict
+    """
+    with _lock:
+        return dict(_stats, entries=len(_results), max_bytes=MAX_BYTES,
+                    hit_rate=_stats['hits'] / max(_stats['hits'] + _stats['misses'], 1))
+
+def clear():
+    """
+    descarta todos os resultados guardados (os contadores continuam).
+    Input: None
+    Output: None
+    """
+    with _lock:
+        _results.clear()
+        _stats['bytes'] = 0
@@ -0,0 +1,29 @@
+#========================================
+#Reamostragem de séries por data
+#========================================
+# Quantidade máxima de pontos enviados ao navegador num gráfico por data. Acima disso a
+# série passa de diária para semanal e, se ainda for grande, para mensal.
+MAX_POINTS = 180
+
+# Frequências tentadas em ordem: regra do pandas (None = série original) e nome exibido
+FREQUENCIES = [(None, 'dia'), ('W-MON', 'semana'), ('MS', 'mês')]
+
+#========================================
+#Funções
+#========================================
+def resample_dates(df_aux, date_col, value_cols, max_points = MAX_POINTS):
+    """
+    reduz uma série diária de contagens/somas para no máximo max_points pontos, somando os
+    valores por semana (a partir de segunda-feira) ou por mês. Os totais não mudam.
+    Input: DataFrame (uma linha por dia), String (coluna de data), lista de Strings, Int
+    Output: DataFrame reamostrado, String com a granularidade ('dia', 'semana' ou 'mês')
+    """
+    for freq, label in FREQUENCIES:
+        if freq is None:
+            df_out = df_aux
+        else:
+            df_out = (df_aux.set_index(date_col)[value_cols]
+                      .resample(freq, label='left', closed='left').sum().reset_index())
+        if len(df_out) <= max_points:
+            break
+    return df_out, label
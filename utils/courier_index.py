@@ -0,0 +1,121 @@
+#Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+from utils.data import load_derived
+from utils.instrument import instrument
+
+#========================================
+#Índice por entregador
+#========================================
+# Colunas acumuladas pelo índice, na ordem das colunas da matriz running
+RUNNING_COLUMNS = ['ratings_n', 'ratings_sum', 'time_n', 'time_sum']
+
+# casas decimais das médias da tabela por entregador
+MEAN_DECIMALS = 10
+
+class CourierIndex:
+    """
+    índice do DataFrame limpo por entregador. As posições das linhas ficam ordenadas por
+    (entregador, condição de trânsito, posição), então os pedidos de um entregador com uma
+    condição de trânsito e dentro de uma faixa de linhas (o filtro de datas, já que as linhas
+    estão em ordem de Order_Date) são uma fatia contínua, achada por busca binária.
+    Ao lado das posições ficam as somas acumuladas (running) das avaliações e do tempo de
+    entrega: o agregado de qualquer fatia é a diferença de duas linhas, então a tabela por
+    entregador custa duas buscas binárias por entregador e condição, sem percorrer os pedidos.
+    Linhas sem entregador ou sem trânsito informado ficam fora do índice (nunca passam no
+    filtro da barra lateral).
+    """
+
+    @instrument
+    def __init__(self, df1):
+        self.df = df1
+        couriers = df1['Delivery_person_ID']
+        traffic = df1['Road_traffic_density']
+        self.couriers = couriers.cat.categories
+        self.traffic_categories = traffic.cat.categories
+        self.rows = len(df1)
+
+        codes = couriers.cat.codes.to_numpy().astype('int64')
+        traffic_codes = traffic.cat.codes.to_numpy().astype('int64')
+        positions = np.flatnonzero((codes >= 0) & (traffic_codes >= 0))
+        keys = self._key(codes[positions], traffic_codes[positions], positions)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.positions = positions[order]
+
+        ratings = df1['Delivery_person_Ratings'].to_numpy(dtype='float64')[self.positions]
+        times = df1['Time_taken(min)'].to_numpy(dtype='float64')[self.positions]
+        values = np.column_stack([~np.isnan(ratings), np.nan_to_num(ratings), ~np.isnan(times), np.nan_to_num(times)])
+        self.running = np.vstack([np.zeros((1, len(RUNNING_COLUMNS))), np.cumsum(values, axis=0)])
+
+    def _key(self, codes, traffic_codes, positions):
+        """
+        gera a chave de ordenação (entregador, trânsito, posição) de cada linha.
+        Input: arrays (código do entregador, código do trânsito, posição)
+        Output: array int64
+        """
+        return (codes * len(self.traffic_categories) + traffic_codes) * (self.rows + 1) + positions
+
+    def _bounds(self, codes, start, stop, traffic_options):
+        """
+        gera, para cada condição de trânsito selecionada, o início e o fim da fatia de cada
+        entregador de codes dentro da faixa de linhas [start, stop).
+        Input: array de códigos de entregador, Int, Int, lista de Strings
+        Output: lista de tuplas (array de inícios, array de fins)
+        """
+        bounds = []
+        for option in traffic_options:
+            if option not in self.traffic_categories:
+                continue
+            traffic_code = self.traffic_categories.get_loc(option)
+            lo = np.searchsorted(self.keys, self._key(codes, traffic_code, start), side='left')
+            hi = np.searchsorted(self.keys, self._key(codes, traffic_code, stop), side='left')
+            bounds.append((lo, hi))
+        return bounds
+
+    @instrument
+    def table(self, start, stop, traffic_options):
+        """
+        gera a tabela por entregador dos pedidos na faixa de linhas [start, stop) (ver
+        DateIndex.cutoff e DateIndex.start_row) com as condições de trânsito selecionadas:
+        quantidade de pedidos, avaliação média e tempo médio de entrega.
+        Só entram os entregadores com ao menos um pedido na seleção, na ordem dos IDs.
+        Input: Int, Int, lista de Strings
+        Output: DataFrame (Delivery_person_ID, orders, Delivery_person_Ratings, avg_time)
+        """
+        codes = np.arange(len(self.couriers), dtype='int64')
+        orders = np.zeros(len(codes), dtype='int64')
+        sums = np.zeros((len(codes), len(RUNNING_COLUMNS)))
+        for lo, hi in self._bounds(codes, start, stop, traffic_options):
+            orders += hi - lo
+            sums += self.running[hi] - self.running[lo]
+        keep = orders > 0
+        sums = sums[keep]
+        # a diferença de somas acumuladas só difere da soma direta nos últimos bits; o
+        # arredondamento mantém como empate (desfeito pelo ID na ordenação) médias iguais
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return pd.DataFrame({'Delivery_person_ID': pd.Categorical.from_codes(codes[keep], self.couriers),
+                                 'orders': orders[keep],
+                                 'Delivery_person_Ratings': np.round(np.where(sums[:, 0] > 0, sums[:, 1] / sums[:, 0], np.nan), MEAN_DECIMALS),
+                                 'avg_time': np.round(np.where(sums[:, 2] > 0, sums[:, 3] / sums[:, 2], np.nan), MEAN_DECIMALS)})
+
+    def courier_positions(self, courier, start, stop, traffic_options):
+        """
+        gera as posições dos pedidos de um entregador na faixa de linhas [start, stop) com as
+        condições de trânsito selecionadas, em ordem crescente (ordem de data).
+        Input: String (Delivery_person_ID), Int, Int, lista de Strings
+        Output: array de posições (vazio quando o entregador não existe)
+        """
+        if courier not in self.couriers:
+            return np.zeros(0, dtype='int64')
+        codes = np.array([self.couriers.get_loc(courier)], dtype='int64')
+        slices = [self.positions[lo[0]:hi[0]] for lo, hi in self._bounds(codes, start, stop, traffic_options)]
+        return np.sort(np.concatenate(slices)) if slices else np.zeros(0, dtype='int64')
+
+def load_courier_index(path = 'train.csv'):
+    """
+    carrega o índice por entregador do csv, refeito só quando o csv muda (ver data.load_derived).
+    Input: String (ou entrada, ver data.snapshot)
+    Output: CourierIndex
+    """
+    return load_derived(path, 'courier_index', CourierIndex)
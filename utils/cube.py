@@ -0,0 +1,127 @@
+#Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+from utils import parallel
+from utils.data import concat_clean, load_derived
+from utils.instrument import instrument
+
+#========================================
+#Cubo diário
+#========================================
+# Cada linha do cubo é uma combinação distinta das dimensões abaixo, com a quantidade de
+# pedidos e, para cada medida, a quantidade de valores, a soma e a soma dos quadrados.
+# Média e desvio padrão de qualquer agrupamento, com qualquer data limite e filtro de
+# trânsito, saem da soma dessas células, sem voltar aos pedidos.
+DIMENSIONS = ['Order_Date', 'week_of_year', 'City', 'Road_traffic_density', 'Festival',
+              'Type_of_order', 'Weatherconditions']
+
+MEASURES = {'time': 'Time_taken(min)', 'distance': 'distance', 'ratings': 'Delivery_person_Ratings'}
+
+#========================================
+#Funções
+#========================================
+@instrument
+def build_cube(df1):
+    """
+    gera o cubo diário a partir do DataFrame limpo.
+    As dimensões category são agrupadas pelos seus códigos, o que mantém as células de
+    valores ausentes (que o groupby descartaria) e evita agrupar texto.
+    Input: DataFrame
+    Output: DataFrame (cubo)
+    """
+    keys = {dim: (df1[dim].cat.codes if isinstance(df1[dim].dtype, pd.CategoricalDtype) else df1[dim]) for dim in DIMENSIONS}
+    df_aux = pd.DataFrame(keys)
+    df_aux['orders'] = 1
+    for measure, col in MEASURES.items():
+        values = df1[col].astype('float64')
+        df_aux[measure + '_n'] = values.notna().astype('int64')
+        df_aux[measure + '_sum'] = values.fillna(0)
+        df_aux[measure + '_sumsq'] = values.fillna(0) ** 2
+    cube = df_aux.groupby(DIMENSIONS, sort=False).sum().reset_index()
+    for dim in DIMENSIONS:
+        if isinstance(df1[dim].dtype, pd.CategoricalDtype):
+            cube[dim] = pd.Categorical.from_codes(cube[dim], df1[dim].cat.categories)
+    return cube
+
+@instrument
+def merge_cubes(*cubes):
+    """
+    junta cubos (ex.: o do histórico e o das linhas novas do csv), somando as células repetidas.
+    Input: DataFrames (cubos)
+    Output: DataFrame (cubo)
+    """
+    cube = concat_clean(list(cubes))
+    return cube.groupby(DIMENSIONS, sort=False, observed=True, dropna=False).sum().reset_index()
+
+@instrument
+def build_cube_parallel(df1):
+    """
+    gera o cubo diário dividindo as linhas em faixas, uma por processo do pool (ver
+    utils/parallel.py): cada processo monta o cubo parcial da sua faixa e os parciais
+    são somados pelo merge_cubes. Para DataFrames pequenos (ou CURRY_WORKERS=1) é o build_cube.
+    Input: DataFrame
+    Output: DataFrame (cubo)
+    """
+    if not parallel.enabled(rows=len(df1)):
+        return build_cube(df1)
+    df_aux = df1[DIMENSIONS + list(MEASURES.values())]
+    parts = [(df_aux.iloc[start:stop],) for start, stop in parallel.split_rows(len(df_aux))]
+    return merge_cubes(*parallel.pool_map(build_cube, parts))
+
+def load_cube(path = 'train.csv'):
+    """
+    carrega o cubo diário do csv, calculado uma vez e atualizado só com as linhas novas
+    quando o csv cresce (ver data.load_derived).
+    Input: String (ou entrada, ver data.snapshot)
+    Output: DataFrame (cubo)
+    """
+    return load_derived(path, 'cube', build_cube_parallel, merge_cubes)
+
+def filter_cube(cube, date_until, traffic_options, date_from = None):
+    """
+    aplica ao cubo os filtros da barra lateral: data limite e condições de trânsito (e,
+    opcionalmente, a data inicial).
+    Input: DataFrame (cubo), datetime, lista de Strings, datetime (opcional)
+    Output: DataFrame (cubo)
+    """
+    mask = (cube['Order_Date'] <= date_until) & (cube['Road_traffic_density'].isin(traffic_options))
+    if date_from is not None:
+        mask &= cube['Order_Date'] >= date_from
+    return cube.loc[mask, :]
+
+def cube_orders(cube, by):
+    """
+    gera a quantidade de pedidos por grupo, igual a df1.groupby(by)['ID'].count().
+    Input: DataFrame (cubo), String ou lista de Strings
+    Output: DataFrame
+    """
+    return cube.groupby(by, observed=True)['orders'].sum().reset_index()
+
+def cube_avg_std(cube, by, measures):
+    """
+    gera média e desvio padrão por grupo das medidas, iguais a
+    df1.groupby(by).agg({coluna: ['mean', 'std']}), a partir das somas do cubo.
+    Com by vazio ([]) o resultado é uma linha com as estatísticas de todos os pedidos.
+    Input: DataFrame (cubo), String ou lista de Strings, lista de medidas ('time', 'distance', 'ratings')
+    Output: DataFrame com as colunas avg_<medida> e std_<medida>
+    """
+    cols = [measure + suffix for measure in measures for suffix in ('_n', '_sum', '_sumsq')]
+    if len(by) == 0:
+        return avg_std_from_sums(cube[cols].sum().to_frame().T, measures)
+    return avg_std_from_sums(cube.groupby(by, observed=True)[cols].sum(), measures)
+
+def avg_std_from_sums(df_aux, measures):
+    """
+    gera média e desvio padrão (ddof=1) a partir da quantidade, soma e soma dos quadrados
+    de cada medida já agrupadas (colunas <medida>_n, <medida>_sum e <medida>_sumsq).
+    Input: DataFrame (grupos no índice), lista de medidas
+    Output: DataFrame com os grupos e as colunas avg_<medida> e std_<medida>
+    """
+    df_aux = df_aux.astype({measure + suffix: 'float64' for measure in measures for suffix in ('_n', '_sum', '_sumsq')})
+    for measure in measures:
+        n = df_aux[measure + '_n']
+        total = df_aux[measure + '_sum']
+        df_aux['avg_' + measure] = total / n
+        var = ((df_aux[measure + '_sumsq'] - total * total / n) / (n - 1)).clip(lower=0)
+        df_aux['std_' + measure] = np.sqrt(var).where(n > 1)
+    return df_aux[[stat + '_' + measure for measure in measures for stat in ('avg', 'std')]].reset_index(drop=all(name is None for name in df_aux.index.names))
@@ -0,0 +1,623 @@
+#Libraries
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from datetime import datetime as dt
+
+#Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+from utils.geo import haversine_np
+from utils import parallel, store
+from utils.instrument import instrument
+
+#========================================
+#Cache em memória
+#========================================
+# O módulo fica carregado no processo do Streamlit entre as execuções das páginas,
+# então o DataFrame limpo guardado aqui é compartilhado por todos os reruns e sessões.
+# O _lock só protege o dicionário: os agregados derivados são calculados fora dele, com um
+# lock por (csv, agregado) para que sessões simultâneas não calculem o mesmo agregado.
+_cache = {}
+_lock = threading.Lock()
+_build_locks = {}   # (caminho absoluto do csv, nome do agregado) -> threading.Lock
+
+# Versão da limpeza gravada no cache em disco: incrementar sempre que o clean_code mudar,
+# para que caches gerados pela versão anterior sejam descartados.
+CLEAN_VERSION = 3
+
+# colunas de texto com poucos valores distintos, guardadas como category
+CATEGORY_COLUMNS = ['Delivery_person_ID', 'Weatherconditions', 'Road_traffic_density', 'Type_of_order',
+                    'Type_of_vehicle', 'Festival', 'City', 'Time_Orderd', 'Time_Order_picked']
+
+COORD_COLUMNS = ['Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude', 'Delivery_location_longitude']
+
+# tipos usados na leitura do csv: o texto vira category (e é limpo por valor distinto no
+# clean_code) e os números são convertidos pelo próprio leitor do pandas
+RAW_DTYPES = dict({col: 'category' for col in CATEGORY_COLUMNS + ['Order_Date', 'Time_taken(min)']},
+                  Delivery_person_Age='Int8', multiple_deliveries='Int8', Delivery_person_Ratings='float32',
+                  Vehicle_condition='int8')
+NA_VALUES = ['NaN ', 'conditions NaN']
+
+# arquivos a partir desse tamanho são lidos, limpos e gravados no cache em disco em pedaços
+# de CHUNK_ROWS linhas, para que o csv bruto nunca fique inteiro em memória
+STREAM_MIN_BYTES = 256 * 2**20
+CHUNK_ROWS = 250_000
+
+#========================================
+#Funções
+#========================================
+@instrument
+def read_raw(path, **kwargs):
+    """
+    lê o train.csv já com os tipos de cada coluna: números direto como int/float, o texto
+    'NaN ' como valor ausente e as colunas de texto repetitivo como category, de modo que a
+    limpeza do texto no clean_code só precise olhar os valores distintos.
+    Input: String (ou arquivo aberto), argumentos extras do pd.read_csv
+    Output: DataFrame
+    """
+    return pd.read_csv(path, dtype=RAW_DTYPES, na_values=NA_VALUES, **kwargs)
+
+@instrument
+def _clean_categorical(s, prefix = ''):
+    """
+    remove espaços (e um prefixo opcional) de uma coluna de texto trabalhando só nas
+    categorias distintas, e não linha a linha. O texto 'NaN' vira valor ausente.
+    Input: Series (category ou texto), String
+    Output: Series category
+    """
+    s = s.astype('category')
+    clean = s.cat.categories.astype(str).str.strip().str.removeprefix(prefix).str.strip()
+    categories = pd.Index(clean.unique()).drop('NaN', errors='ignore').sort_values()
+    # código antigo -> código novo; o -1 do final mantém os valores ausentes
+    mapping = np.append(categories.get_indexer(clean), -1)
+    codes = mapping[s.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, categories), index=s.index, name=s.name)
+
+@instrument
+def clean_code(df1):
+    """funcao criada para realizar a limpeza dos dados do arquivo train.csv
+       Limpezas realizadas:
+       #1. removendo espaços no final dos dados (e o prefixo 'conditions' do clima), com o texto 'NaN' como valor ausente.
+       #2. convertendo a coluna Delivery_person_Age de str para int
+       #3. convertendo a coluna Delivery_person_Ratings de str para float
+       #4. convertendo a coluna Order_Date de str para datetime
+       #5. convertendo a coluna multiple_deliveries de str para int
+       #6. Definindo apenas números para a coluna Time_taken(min)
+       #7. Criando a coluna 'distance' com base na latitude e longitude do restaurante e entrega
+       #8. Criando a coluna 'week_of_year'
+
+       Os inteiros com valores ausentes usam os tipos nulos do pandas (Int8), os decimais
+       usam float32 e as colunas de texto repetitivo ficam como category.
+       Nenhum passo chama uma função Python por linha: as colunas de texto são limpas nas
+       suas categorias distintas e os números já chegam convertidos pelo read_raw.
+
+       Input: Dataframe (de preferência lido com o read_raw)
+       Output: Dataframe
+    """
+
+    #1. removendo espaços no final dos dados (e o prefixo 'conditions' do clima)
+    df1 = df1.reset_index(drop = True)
+    df1['ID'] = df1['ID'].str.strip()
+    for col in CATEGORY_COLUMNS:
+        df1[col] = _clean_categorical(df1[col], prefix = 'conditions' if col == 'Weatherconditions' else '')
+
+    #2. convertendo a coluna Age de str para int
+    df1['Delivery_person_Age'] = pd.to_numeric(df1['Delivery_person_Age'], errors='coerce').astype('Int8')
+
+    #3. convertendo a coluna Ratings de str para float
+    df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype('float32')
+
+    #4. convertendo a coluna order_date de str para datetime (uma vez por data distinta)
+    order_date = df1['Order_Date'].astype('category')
+    dates = pd.to_datetime(order_date.cat.categories.astype(str).str.strip(), format='%d-%m-%Y')
+    df1['Order_Date'] = order_date.cat.rename_categories(dates).astype('datetime64[ns]')
+
+    #5. convertendo a coluna multiple_delivery de str para int
+    df1['multiple_deliveries'] = pd.to_numeric(df1['multiple_deliveries'], errors='coerce').astype('Int8')
+
+    #6. Definindo apenas números para a coluna Time_taken(min)
+    time_taken = _clean_categorical(df1['Time_taken(min)'], prefix = '(min)')
+    df1['Time_taken(min)'] = time_taken.cat.rename_categories(time_taken.cat.categories.astype('int16')).astype('int16')
+
+    #7. Criando a coluna 'distance'
+    df1[COORD_COLUMNS] = df1[COORD_COLUMNS].abs()
+    df1['distance'] = haversine_np(df1['Delivery_location_latitude'], df1['Delivery_location_longitude'],
+                                   df1['Restaurant_latitude'], df1['Restaurant_longitude']).astype('float32')
+    df1[COORD_COLUMNS] = df1[COORD_COLUMNS].astype('float32')
+
+    #8. Criando a coluna 'week_of_year' (uma vez por data distinta)
+    weeks = dates.strftime('%U').astype('int8')
+    df1['week_of_year'] = np.asarray(weeks)[order_date.cat.codes.to_numpy()]
+
+    df1['Vehicle_condition'] = df1['Vehicle_condition'].astype('int8')
+
+    return df1
+
+def memory_report(df1):
+    """
+    gera a tabela de memória ocupada por coluna do DataFrame, da maior para a menor.
+    Input: DataFrame
+    Output: DataFrame
+    """
+    mem = df1.memory_usage(deep=True, index=False)
+    df_aux = pd.DataFrame({'dtype': df1.dtypes.astype(str), 'memory_mb': mem / 2**20})
+    df_aux['memory_perc'] = df_aux['memory_mb'] / df_aux['memory_mb'].sum()
+    df_aux = df_aux.sort_values('memory_mb', ascending=False).rename_axis('column').reset_index()
+    return df_aux
+
+def file_stat(path):
+    """
+    gera a assinatura rápida do arquivo (tamanho e data de modificação).
+    Input: String
+    Output: Tupla
+    """
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+@instrument
+def file_source(path, stat, prefix_size = 0, block_size = 1 << 20):
+    """
+    gera a assinatura completa do arquivo: tamanho, data de modificação, hash sha1 do
+    conteúdo e se o arquivo termina com quebra de linha.
+    Com prefix_size, devolve também o hash dos primeiros prefix_size bytes, calculado na
+    mesma leitura: se ele bater com o hash de uma versão anterior do arquivo, o arquivo só
+    recebeu linhas novas no final.
+    Input: String, Tupla (file_stat), Int, Int
+    Output: Dict, String (hash do prefixo ou None)
+    """
+    sha = hashlib.sha1()
+    prefix = None
+    last = b''
+    with open(path, 'rb') as f:
+        remaining = prefix_size
+        while remaining > 0:
+            block = f.read(min(block_size, remaining))
+            if not block:
+                break
+            sha.update(block)
+            remaining -= len(block)
+            last = block
+        if prefix_size and remaining == 0:
+            prefix = sha.hexdigest()
+        for block in iter(lambda: f.read(block_size), b''):
+            sha.update(block)
+            last = block
+    source = {'size': stat[0], 'mtime_ns': stat[1], 'sha1': sha.hexdigest(), 'newline': last.endswith(b'\n')}
+    return source, prefix
+
+def concat_clean(frames):
+    """
+    junta DataFrames limpos (ou agregados feitos a partir deles) mantendo as colunas
+    category. O pd.concat sozinho converte para
+    texto as colunas category com categorias diferentes, então antes todas recebem a união
+    das categorias, em ordem alfabética.
+    Input: lista de DataFrames
+    Output: DataFrame
+    """
+    frames = [df for df in frames if len(df)] or frames[:1]
+    dtypes = {}
+    for col in frames[0].select_dtypes('category'):
+        categories = pd.Index([]).append([df[col].cat.categories for df in frames]).unique().sort_values()
+        dtypes[col] = pd.CategoricalDtype(categories)
+    return pd.concat([df.astype(dtypes) for df in frames], ignore_index=True)
+
+def iter_clean_chunks(path, chunksize = CHUNK_ROWS, offset = 0):
+    """
+    lê e limpa o csv em pedaços de chunksize linhas, sem carregar o arquivo inteiro.
+    Com offset, lê só as linhas a partir desse byte (o fim do trecho já processado),
+    usando o cabeçalho da primeira linha do arquivo.
+    Com CURRY_WORKERS > 1 e um trecho grande, os pedaços são limpos em paralelo (ver
+    iter_clean_parallel) e têm o tamanho definido por parallel.PART_BYTES.
+    Input: String, Int, Int
+    Output: gerador de DataFrames limpos
+    """
+    if parallel.enabled(size=os.path.getsize(path) - offset):
+        yield from iter_clean_parallel(path, offset)
+        return
+    kwargs = {}
+    if offset:
+        kwargs = {'header': None, 'names': pd.read_csv(path, nrows=0).columns}
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for chunk in read_raw(f, chunksize=chunksize, **kwargs):
+            yield clean_code(chunk)
+
+def _clean_range(path, start, end, names):
+    """
+    lê e limpa as linhas entre os bytes start e end do csv (tarefa de um processo do pool).
+    Input: String, Int, Int, lista de Strings (colunas do cabeçalho)
+    Output: DataFrame limpo
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        raw = f.read(end - start)
+    return clean_code(read_raw(io.BytesIO(raw), header=None, names=names))
+
+@instrument
+def iter_clean_parallel(path, offset = 0):
+    """
+    lê e limpa o csv em trechos de linhas inteiras, cada um num processo do pool
+    (ver utils/parallel.py), devolvendo os pedaços limpos na ordem do arquivo.
+    Com offset, lê só as linhas a partir desse byte, como o iter_clean_chunks.
+    Input: String, Int
+    Output: gerador de DataFrames limpos
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+    names = list(pd.read_csv(io.BytesIO(header), nrows=0).columns)
+    ranges = parallel.split_file(path, max(offset, len(header)))
+    yield from parallel.pool_map(_clean_range, [(path, start, end, names) for start, end in ranges])
+
+@instrument
+def ingest(path, source, chunksize = None):
+    """
+    limpa o csv e grava o resultado no cache em disco.
+    Arquivos a partir de STREAM_MIN_BYTES (ou quando o chunksize é informado) são lidos,
+    limpos e gravados pedaço a pedaço, e o DataFrame final é lido já compacto do Parquet:
+    o pico de memória fica no tamanho de um pedaço bruto, e não do csv inteiro.
+    Sem o pyarrow, ou se a gravação falhar, o csv é limpo de uma vez só (ou em trechos
+    paralelos, com CURRY_WORKERS > 1, ver utils/parallel.py).
+    Input: String, Dict (assinatura do csv), Int
+    Output: DataFrame
+    """
+    if chunksize is None and source['size'] >= STREAM_MIN_BYTES:
+        chunksize = CHUNK_ROWS
+    if chunksize is not None and store.available():
+        manifest = store.write_store_chunks(path, iter_clean_chunks(path, chunksize), source, CLEAN_VERSION)
+        df1 = store.read_store(path, manifest) if manifest is not None else None
+        if df1 is not None:
+            return df1
+
+    if parallel.enabled(size=source['size']):
+        df1 = concat_clean(list(iter_clean_parallel(path)))
+    else:
+        df1 = clean_code(read_raw(path))
+    store.write_store(path, df1, source, CLEAN_VERSION)
+    return df1
+
+@instrument
+def ingest_tail(path, source, base, df_base = None, manifest = None):
+    """
+    limpa só as linhas acrescentadas ao final do csv desde a versão base e junta o resultado
+    ao que já foi processado: ao DataFrame em memória (df_base) e, quando o manifest em disco
+    corresponde à versão base, ao cache em disco como uma parte nova.
+    As linhas novas são ordenadas por data entre si: quando todas são de datas iguais ou
+    posteriores às da versão base, o resultado já sai em ordem de data (ver build_entry).
+    Input: String, Dict (assinatura atual), Dict (assinatura base), DataFrame, Dict
+    Output: DataFrame ou None quando não há de onde partir
+    """
+    tail = []
+    def chunks():
+        for df_tail in iter_clean_chunks(path, CHUNK_ROWS, offset=base['size']):
+            df_tail = df_tail.sort_values('Order_Date', kind='mergesort', ignore_index=True)
+            tail.append(df_tail)
+            yield df_tail
+
+    written = None
+    if manifest is not None and manifest['source']['sha1'] == base['sha1']:
+        written = store.write_store_chunks(path, chunks(), source, CLEAN_VERSION, base=manifest)
+    if df_base is None:
+        return store.read_store(path, written) if written is not None else None
+
+    if written is None:
+        tail = list(iter_clean_chunks(path, CHUNK_ROWS, offset=base['size']))
+    if len(tail) > 0:
+        tail = [concat_clean(tail).sort_values('Order_Date', kind='mergesort', ignore_index=True)]
+    df1 = concat_clean([df_base] + tail)
+    if written is None:
+        store.write_store(path, df1, source, CLEAN_VERSION)
+    return df1
+
+@instrument
+def build_entry(path, stat, entry = None, chunksize = None):
+    """
+    monta a entrada do cache em memória do csv: o DataFrame limpo, a assinatura do csv e os
+    agregados derivados que continuam valendo.
+    O DataFrame limpo é lido do cache em disco (train.parquet) quando ele foi gerado a partir
+    do mesmo csv e da mesma versão da limpeza; caso contrário o csv é limpo e o cache em disco
+    é regravado (em pedaços para arquivos grandes, ver ingest).
+    Quando o csv só cresceu (o começo do arquivo é idêntico à versão já processada), apenas
+    as linhas novas são limpas e juntadas ao que já estava em memória e em disco.
+    Input: String, Tupla (file_stat), Dict (entrada atual ou None), Int
+    Output: Dict (entrada)
+    """
+    manifest = store.read_manifest(path)
+    if manifest is not None and manifest['version'] != CLEAN_VERSION:
+        manifest = None
+    if manifest is not None and (manifest['source']['size'], manifest['source']['mtime_ns']) == stat:
+        source, base = manifest['source'], None
+    else:
+        # versão já processada mais recente (em memória ou em disco) da qual o csv pode ter crescido
+        known = [entry['source'] if entry is not None else None, manifest['source'] if manifest is not None else None]
+        known = [k for k in known if k is not None and k.get('newline') and k['size'] < stat[0]]
+        base = max(known, key=lambda k: k['size'], default=None)
+        source, prefix = file_source(path, stat, base['size'] if base is not None else 0)
+        if base is not None and prefix != base['sha1']:
+            base = None
+
+    df1 = None
+    if entry is not None and entry['source']['sha1'] == source['sha1']:
+        df1 = entry['df']
+    elif manifest is not None and manifest['source']['sha1'] == source['sha1']:
+        df1 = store.read_store(path, manifest)
+    if df1 is not None:
+        if manifest is not None and manifest['source']['sha1'] == source['sha1'] and manifest['source'] != source:
+            store.update_source(path, manifest, source)
+    elif base is not None:
+        df_base = entry['df'] if entry is not None and entry['source']['sha1'] == base['sha1'] else None
+        df1 = ingest_tail(path, source, base, df_base, manifest)
+    if df1 is None:
+        df1 = ingest(path, source, chunksize)
+
+    # agregados derivados continuam valendo para as linhas antigas quando o csv só cresceu
+    derived = entry['derived'] if base is not None and entry is not None and entry['source']['sha1'] == base['sha1'] else {}
+    if entry is not None and df1 is entry['df']:
+        derived = entry['derived']
+    # as linhas ficam em ordem de data; um csv que só recebe pedidos mais novos no final
+    # continua ordenado depois da junção (ingest_tail ordena as linhas novas) e não precisa
+    # ser reordenado nem ter os agregados refeitos. Só linhas novas com datas anteriores às
+    # da versão base levam à reordenação completa
+    if not df1['Order_Date'].is_monotonic_increasing:
+        df1 = df1.sort_values('Order_Date', kind='mergesort', ignore_index=True)
+        derived = {}
+    # cópia do dicionário: a entrada atual continua servindo enquanto a nova é preparada
+    return {'path': os.path.abspath(path), 'stat': stat, 'source': source, 'df': df1,
+            'derived': dict(derived), 'loaded_at': time.time()}
+
+@instrument
+def load_data(path = 'train.csv', chunksize = None):
+    """
+    carrega o train.csv e aplica o clean_code uma única vez por processo.
+    O resultado fica em memória e só é recalculado quando o arquivo muda: o tamanho e a data
+    de modificação são conferidos a cada chamada e, se mudarem, o hash do conteúdo decide
+    se o arquivo foi realmente alterado (ver build_entry).
+    Com o atualizador em segundo plano ligado para o csv (start_refresher), a conferência
+    sai do caminho das páginas: a versão atual é devolvida direto e a nova é preparada e
+    trocada pela thread do atualizador. Só a primeira carga do processo é feita aqui.
+    As linhas do DataFrame retornado estão em ordem crescente de Order_Date (ver date_index).
+    O DataFrame retornado é compartilhado entre sessões e não deve ser alterado no lugar.
+    Input: String, Int (linhas por pedaço na leitura em pedaços)
+    Output: DataFrame
+    """
+    return _load_entry(path, chunksize)['df']
+
+def _load_entry(path, chunksize = None):
+    """
+    devolve a entrada em uso do csv, montando-a quando ela não existe ou o csv mudou (ver load_data).
+    Input: String, Int
+    Output: Dict (entrada)
+    """
+    key = os.path.abspath(path)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and key in _refreshers:
+            return entry
+        stat = file_stat(path)
+        if entry is not None and entry['stat'] == stat:
+            return entry
+        entry = build_entry(path, stat, entry, chunksize)
+        _cache[key] = entry
+        return entry
+
+def snapshot(path = 'train.csv'):
+    """
+    gera a entrada em uso do csv (DataFrame limpo, assinatura e agregados derivados).
+    O atualizador troca a entrada do cache, mas não altera uma entrada já obtida: os load_*
+    aceitam a entrada no lugar do caminho, e tudo o que for carregado a partir dela vem da
+    mesma versão do dataset, mesmo que a troca aconteça no meio de uma execução.
+    Uma entrada é devolvida como está.
+    Input: String ou Dict (entrada)
+    Output: Dict (entrada)
+    """
+    if isinstance(path, dict):
+        return path
+    return _load_entry(path)
+
+def data_version(path = 'train.csv'):
+    """
+    gera a versão do dataset carregado: o início do hash sha1 do csv que o originou.
+    Serve de chave para resultados calculados a partir dele.
+    Input: String ou Dict (entrada, ver snapshot)
+    Output: String
+    """
+    return snapshot(path)['source']['sha1'][:12]
+
+def dataset_info(path = 'train.csv'):
+    """
+    gera a identificação da versão do dataset em uso, para exibir nas páginas.
+    Input: String
+    Output: Dict com version, rows, loaded_at (datetime) e refreshing (troca em preparo)
+    """
+    entry = _load_entry(path)
+    key = entry['path']
+    return {'version': entry['source']['sha1'][:12], 'rows': len(entry['df']),
+            'loaded_at': dt.fromtimestamp(entry['loaded_at']), 'refreshing': key in _staged}
+
+def dataset_caption(path = 'train.csv'):
+    """
+    gera o texto da versão do dataset em uso para a barra lateral das páginas.
+    Input: String
+    Output: String
+    """
+    info = dataset_info(path)
+    text = 'Dados: versão {} · {:,} pedidos · carregados em {:%d/%m/%Y %H:%M}'.format(
+        info['version'], info['rows'], info['loaded_at']).replace(',', '.')
+    if info['refreshing']:
+        text += ' · nova versão em preparo'
+    return text
+
+def _build_item(df1, item, build, merge):
+    """
+    calcula o agregado derivado de df1, atualizando com as linhas novas (via merge) o
+    agregado anterior item quando ele cobre só o começo de df1.
+    Input: DataFrame, Dict (agregado anterior ou None), função DataFrame -> agregado,
+           função (agregado, agregado) -> agregado
+    Output: Dict (agregado novo)
+    """
+    if item is not None and merge is not None and item['rows'] < len(df1):
+        value = merge(item['value'], build(df1.iloc[item['rows']:]))
+    else:
+        value = build(df1)
+    return {'rows': len(df1), 'value': value, 'build': build, 'merge': merge}
+
+def _derive(entry, name, build, merge):
+    """
+    devolve o agregado derivado name de uma entrada que ainda não está em uso (ex.: a
+    preparada pelo atualizador), calculando-o quando não corresponde ao DataFrame da entrada.
+    Input: Dict (entrada), String, função DataFrame -> agregado, função (agregado, agregado) -> agregado
+    Output: agregado
+    """
+    item = entry['derived'].get(name)
+    if item is None or item['rows'] != len(entry['df']):
+        item = entry['derived'][name] = _build_item(entry['df'], item, build, merge)
+    return item['value']
+
+def load_derived(path, name, build, merge = None):
+    """
+    devolve um agregado calculado a partir do DataFrame limpo do csv (ex.: o cubo diário),
+    guardado junto dele no cache em memória e recalculado só quando o csv muda.
+    Quando o csv só cresceu e merge é informado, o agregado é atualizado com
+    merge(agregado_antigo, build(linhas_novas)), sem percorrer o histórico de novo.
+    Os agregados já pedidos são refeitos pelo atualizador antes de cada troca de versão.
+    O cálculo é feito fora do _lock (um lock por agregado), então um agregado demorado
+    não bloqueia o load_data das demais sessões.
+    Com uma entrada (snapshot) no lugar do caminho, o agregado é o da versão dessa entrada.
+    Input: String ou Dict (entrada), String (nome do agregado), função DataFrame -> agregado,
+           função (agregado, agregado) -> agregado
+    Output: agregado
+    """
+    entry = snapshot(path)
+    df1 = entry['df']
+    with _lock:
+        item = entry['derived'].get(name)
+        if item is not None and item['rows'] == len(df1):
+            return item['value']
+        build_lock = _build_locks.setdefault((entry['path'], name), threading.Lock())
+
+    # o cálculo fica fora do _lock: as demais sessões continuam lendo o cache enquanto isso
+    with build_lock:
+        with _lock:
+            item = entry['derived'].get(name)
+        if item is not None and item['rows'] == len(df1):
+            # outra sessão calculou o agregado enquanto esta esperava
+            return item['value']
+        new_item = _build_item(df1, item, build, merge)
+        with _lock:
+            entry['derived'][name] = new_item
+    return new_item['value']
+
+#========================================
+#Atualização em segundo plano
+#========================================
+# Com start_refresher(path), uma thread por csv confere o arquivo a cada intervalo e, quando
+# ele muda, prepara a nova versão fora do caminho das páginas: monta a entrada (build_entry)
+# e refaz os agregados derivados já usados, enquanto as sessões continuam com a versão
+# atual. A troca é só a substituição da entrada no dicionário do cache, sob o _lock.
+# Um csv sendo gravado muda de tamanho e data de modificação a cada conferência: a nova
+# versão só é preparada depois que os dois ficam iguais em duas conferências seguidas, e é
+# descartada se o arquivo mudar de novo durante a preparação.
+# O intervalo vem de CURRY_REFRESH_S (padrão 30 s; 0 desliga e volta à conferência a
+# cada chamada do load_data).
+REFRESH_INTERVAL_S = float(os.environ.get('CURRY_REFRESH_S', '30'))
+
+_refreshers = {}   # caminho absoluto do csv -> thread do atualizador
+_staged = {}       # caminho absoluto do csv -> entrada sendo preparada
+_seen = {}         # caminho absoluto do csv -> file_stat da conferência anterior
+
+logger = logging.getLogger('curry_company.refresh')
+
+@instrument
+def refresh(path = 'train.csv', settle = False):
+    """
+    confere o csv e, se ele mudou, prepara a nova versão (DataFrame limpo e agregados
+    derivados já usados) e a coloca no lugar da atual de uma vez.
+    Com settle, a mudança só é considerada quando o tamanho e a data de modificação são os
+    mesmos da conferência anterior (o arquivo parou de ser gravado).
+    Input: String, Bool
+    Output: Bool (True quando a versão foi trocada)
+    """
+    key = os.path.abspath(path)
+    stat = file_stat(path)
+    previous, _seen[key] = _seen.get(key), stat
+    with _lock:
+        entry = _cache.get(key)
+    if entry is not None and entry['stat'] == stat:
+        return False
+    if settle and stat != previous:
+        return False
+    new = build_entry(path, stat, entry)
+    if file_stat(path) != stat:
+        # o csv mudou durante a preparação: a versão atual continua até ele parar de mudar
+        return False
+    _staged[key] = new
+    try:
+        with _lock:
+            items = dict(entry['derived']) if entry is not None else {}
+        for name, item in items.items():
+            _derive(new, name, item['build'], item['merge'])
+        while True:
+            # os agregados pedidos pelas páginas durante a preparação também são levados;
+            # são calculados fora do _lock e a troca só acontece quando não falta nenhum
+            with _lock:
+                old_items = dict(_cache.get(key, {'derived': {}})['derived'])
+                missing = {name: item for name, item in old_items.items() if name not in new['derived']}
+                if not missing:
+                    _cache[key] = new
+                    break
+            for name, item in missing.items():
+                _derive(new, name, item['build'], item['merge'])
+    finally:
+        del _staged[key]
+    logger.info('dataset %s: versão %s (%d linhas)', path, new['source']['sha1'][:12], len(new['df']))
+    return True
+
+def _refresh_loop(path, interval):
+    """
+    laço da thread do atualizador: confere o csv a cada interval segundos e troca a versão
+    quando ele mudou e parou de mudar. Erros (ex.: csv sendo regravado) são registrados e
+    a versão atual continua em uso.
+    Input: String, Float
+    Output: None
+    """
+    while True:
+        time.sleep(interval)
+        try:
+            if os.path.exists(path):
+                refresh(path, settle=True)
+        except Exception:
+            logger.exception('falha ao atualizar %s; a versão atual continua em uso', path)
+
+def start_refresher(path = 'train.csv', interval = None):
+    """
+    liga o atualizador em segundo plano do csv (uma thread por csv e por processo; chamadas
+    seguintes não fazem nada). Com intervalo 0 o atualizador fica desligado.
+    Input: String, Float (segundos, padrão REFRESH_INTERVAL_S)
+    Output: None
+    """
+    interval = REFRESH_INTERVAL_S if interval is None else interval
+    key = os.path.abspath(path)
+    if interval <= 0:
+        return
+    with _lock:
+        if key in _refreshers:
+            return
+        thread = threading.Thread(target=_refresh_loop, args=(key, interval), name='curry-refresh', daemon=True)
+        _refreshers[key] = thread
+    thread.start()
+
+def clear_cache(path = None):
+    """
+    descarta do cache em memória o DataFrame limpo (e os agregados) de um csv, ou de todos.
+    A próxima carga volta a ler o cache em disco ou o csv.
+    Input: String (opcional)
+    Output: None
+    """
+    with _lock:
+        if path is None:
+            _cache.clear()
+        else:
+            _cache.pop(os.path.abspath(path), None)
@@ -0,0 +1,108 @@
+#Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+from utils.data import load_derived
+from utils.instrument import instrument
+
+#========================================
+#Índice por data
+#========================================
+class DateIndex:
+    """
+    índice do DataFrame limpo, que o load_data mantém em ordem crescente de Order_Date.
+    Guarda as datas distintas com a linha onde cada uma começa e, para cada condição de
+    trânsito, o mapa de bits das linhas com aquela condição. Com isso:
+       - a primeira e a última data saem direto do índice, sem ordenar a coluna;
+       - o filtro 'Até qual dia?' vira uma faixa de linhas (busca binária);
+       - o filtro de trânsito usa os mapas de bits prontos em vez de comparar texto.
+    Limitação: a faixa só é devolvida como fatia, sem cópia, quando nenhuma linha dela fica
+    de fora pelo trânsito. Pedidos sem trânsito informado (o train.csv tem esses pedidos
+    espalhados por todas as datas) nunca passam no filtro, e por isso o filtro de um período
+    que os contém copia as linhas selecionadas, mesmo com todas as condições marcadas.
+    Tirá-los da faixa exigiria guardá-los fora da ordem de data, o que obrigaria a refazer os
+    agregados a cada csv acrescentado (ver data.build_entry).
+    """
+
+    @instrument
+    def __init__(self, df1):
+        self.df = df1
+        dates = df1['Order_Date'].to_numpy()
+        self.dates, self.offsets = np.unique(dates, return_index=True)
+        self.min_date = pd.Timestamp(self.dates[0])
+        self.max_date = pd.Timestamp(self.dates[-1])
+
+        traffic = df1['Road_traffic_density']
+        codes = traffic.cat.codes.to_numpy()
+        self.traffic_options = traffic.cat.categories[np.unique(codes[codes >= 0])].tolist()
+        self.traffic_bitmaps = {option: codes == i for i, option in enumerate(traffic.cat.categories)}
+        # quantidade de linhas sem trânsito informado antes de cada posição: essas linhas
+        # nunca passam no filtro, então só é possível fatiar sem cópia quando não há nenhuma
+        self.missing_traffic = np.concatenate([[0], np.cumsum(codes < 0)])
+
+    def cutoff(self, date_until):
+        """
+        gera a quantidade de linhas com Order_Date até a data limite (busca binária).
+        Input: datetime
+        Output: Int
+        """
+        i = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date_until)), side='right')
+        return self._row_after(i)
+
+    def start_row(self, date_from):
+        """
+        gera a primeira linha com Order_Date a partir da data inicial (busca binária).
+        Input: datetime
+        Output: Int
+        """
+        i = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date_from)), side='left')
+        return self._row_after(i)
+
+    def _row_after(self, i):
+        """
+        gera a linha onde começa a i-ésima data distinta (o total de linhas quando i é o fim).
+        Input: Int
+        Output: Int
+        """
+        return len(self.df) if i >= len(self.offsets) else int(self.offsets[i])
+
+    def filter(self, date_until, traffic_options, date_from = None):
+        """
+        aplica os filtros da barra lateral, igual a
+        df1.loc[(df1['Order_Date'] <= date_until) & (df1['Road_traffic_density'].isin(traffic_options))].
+        Com date_from, ficam só as linhas a partir dessa data (também uma busca binária).
+        Quando todas as condições de trânsito estão selecionadas e não há linhas sem trânsito
+        informado no período, o resultado é uma fatia do DataFrame, sem cópia.
+        Input: datetime, lista de Strings, datetime (opcional)
+        Output: DataFrame
+        """
+        stop = self.cutoff(date_until)
+        start = min(self.start_row(date_from), stop) if date_from is not None else 0
+        selected = [option for option in traffic_options if option in self.traffic_bitmaps]
+        if set(selected) >= set(self.traffic_options) and self.missing_traffic[stop] == self.missing_traffic[start]:
+            return self.df.iloc[start:stop]
+        mask = np.zeros(stop - start, dtype=bool)
+        for option in selected:
+            mask |= self.traffic_bitmaps[option][start:stop]
+        return self.df.iloc[start:stop].loc[mask]
+
+    def filter_positions(self, positions, date_until, traffic_options):
+        """
+        aplica os filtros da barra lateral a posições de linhas já selecionadas (ex.: o
+        resultado de uma busca no índice espacial), sem montar o DataFrame filtrado inteiro.
+        Input: array de posições em ordem crescente, datetime, lista de Strings
+        Output: array de posições
+        """
+        positions = positions[:np.searchsorted(positions, self.cutoff(date_until))]
+        mask = np.zeros(len(positions), dtype=bool)
+        for option in traffic_options:
+            if option in self.traffic_bitmaps:
+                mask |= self.traffic_bitmaps[option][positions]
+        return positions[mask]
+
+def load_date_index(path = 'train.csv'):
+    """
+    carrega o índice por data do csv, refeito só quando o csv muda (ver data.load_derived).
+    Input: String (ou entrada, ver data.snapshot)
+    Output: DateIndex
+    """
+    return load_derived(path, 'date_index', DateIndex)
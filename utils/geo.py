@@ -0,0 +1,32 @@
+#Bibliotecas necessárias
+import numpy as np
+from utils.instrument import instrument
+
+# Raio médio da Terra em km, o mesmo usado pelo pacote haversine
+AVG_EARTH_RADIUS_KM = 6371.0088
+
+#========================================
+#Funções
+#========================================
+@instrument
+def haversine_np(lat1, lng1, lat2, lng2):
+    """
+    calcula a distância haversine em km entre dois conjuntos de pontos de uma só vez.
+    Equivalente a haversine((lat1, lng1), (lat2, lng2)) aplicado linha a linha.
+    Input: arrays (ou Series) de latitude/longitude em graus
+    Output: array de distâncias em km
+    """
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype='float64')) for v in (lat1, lng1, lat2, lng2))
+    d = np.sin((lat2 - lat1) * 0.5) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) * 0.5) ** 2
+    return 2 * AVG_EARTH_RADIUS_KM * np.arcsin(np.sqrt(d))
+
+def grid_cells(lat, lng, cell_deg):
+    """
+    gera o código da célula de uma grade regular de cell_deg graus para cada ponto.
+    Pontos na mesma célula recebem o mesmo código (linha * quantidade de colunas + coluna).
+    Input: arrays (ou Series) de latitude/longitude em graus, Float (tamanho da célula em graus)
+    Output: array int64 com o código da célula de cada ponto
+    """
+    rows = np.floor((np.asarray(lat, dtype='float64') + 90) / cell_deg).astype('int64')
+    cols = np.floor((np.asarray(lng, dtype='float64') + 180) / cell_deg).astype('int64')
+    return rows * (int(np.ceil(360 / cell_deg)) + 1) + cols
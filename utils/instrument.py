@@ -0,0 +1,176 @@
+#Libraries
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime as dt
+
+#Bibliotecas necessárias
+import pandas as pd
+
+#========================================
+#Instrumentação
+#========================================
+# Medição opcional das etapas de cada execução de página: tempo, linhas processadas e
+# variação da memória do processo (RSS). Ligada com CURRY_PROFILE=1; desligada, os
+# decoradores só chamam a função original.
+#    - @instrument / with stage(...) marcam as etapas (carga, limpeza, agregados, gráficos);
+#    - start_run(página) no início da página e debug_panel() no fim mostram a tabela na
+#      barra lateral e gravam a execução como uma linha json no log 'curry_company.profile'
+#      (também em arquivo, com CURRY_PROFILE_LOG=caminho), junto com os contadores do
+#      cache de resultados (utils/cache.py).
+# Cada sessão do Streamlit roda a página numa thread própria, então as etapas são
+# guardadas por thread; etapas fora de uma execução (ex.: threads de fundo) são ignoradas.
+ENABLED = os.environ.get('CURRY_PROFILE', '') not in ('', '0')
+LOG_PATH = os.environ.get('CURRY_PROFILE_LOG')
+
+logger = logging.getLogger('curry_company.profile')
+_local = threading.local()
+
+#========================================
+#Funções
+#========================================
+def _rss_mb():
+    """
+    gera a memória residente atual do processo em MB (Linux; NaN quando não disponível).
+    Input: None
+    Output: Float
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, IndexError, AttributeError):
+        return float('nan')
+
+def _rows(value):
+    """
+    gera a quantidade de linhas de um DataFrame/Series (None para outros objetos).
+    Input: objeto
+    Output: Int ou None
+    """
+    return len(value) if isinstance(value, (pd.DataFrame, pd.Series)) else None
+
+def _setup_logger():
+    """
+    configura o log 'curry_company.profile' uma vez: mensagens INFO no terminal e, com
+    CURRY_PROFILE_LOG, também no arquivo (uma linha json por execução).
+    Input: None
+    Output: None
+    """
+    if logger.handlers:
+        return
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handlers = [logging.StreamHandler()] + ([logging.FileHandler(LOG_PATH)] if LOG_PATH else [])
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+
+def start_run(page):
+    """
+    inicia a medição de uma execução da página na thread atual.
+    Input: String (nome da página)
+    Output: None
+    """
+    if ENABLED:
+        _local.run = {'page': page, 'date': dt.now().isoformat(timespec='seconds'), 'stages': [], 'depth': 0,
+                      'start': time.perf_counter(), 'rss_mb': _rss_mb()}
+
+@contextmanager
+def stage(name, rows = None):
+    """
+    mede um trecho como uma etapa da execução atual (etapas dentro de etapas ficam com
+    profundidade maior). Sem execução em andamento, não faz nada.
+    Input: String (nome da etapa), Int (linhas processadas, opcional)
+    Output: Dict da etapa (para completar rows depois) ou None
+    """
+    run = getattr(_local, 'run', None) if ENABLED else None
+    if run is None:
+        yield None
+        return
+    record = {'stage': name, 'depth': run['depth'], 'rows': rows}
+    run['stages'].append(record)
+    run['depth'] += 1
+    rss = _rss_mb()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = time.perf_counter() - start
+        record['mem_delta_mb'] = _rss_mb() - rss
+        run['depth'] -= 1
+
+def instrument(fn = None, name = None):
+    """
+    decorador que mede cada chamada da função como uma etapa. As linhas processadas são as
+    do primeiro DataFrame/Series recebido ou, sem ele, as do DataFrame devolvido.
+    Uso: @instrument ou @instrument(name='etapa')
+    Input: função, String (nome da etapa, padrão módulo.função ou arquivo.função)
+    Output: função decorada
+    """
+    if fn is None:
+        return lambda fn: instrument(fn, name)
+    # as páginas rodam como __main__: nelas o nome da etapa usa o nome do arquivo
+    module = fn.__module__ if fn.__module__ not in (None, '__main__') else os.path.splitext(os.path.basename(fn.__code__.co_filename))[0]
+    label = name or module.split('.')[-1] + '.' + fn.__qualname__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not ENABLED or getattr(_local, 'run', None) is None:
+            return fn(*args, **kwargs)
+        rows = next((len(arg) for arg in args if isinstance(arg, (pd.DataFrame, pd.Series))), None)
+        with stage(label, rows) as record:
+            result = fn(*args, **kwargs)
+            if record['rows'] is None:
+                record['rows'] = _rows(result)
+            return result
+    return wrapper
+
+def end_run():
+    """
+    encerra a medição da execução atual e grava a linha json no log, com os contadores do
+    cache de resultados. O tempo da página que não está em nenhuma etapa (layout,
+    serialização dos gráficos) aparece como 'outros'.
+    Input: None
+    Output: Dict da execução ou None quando a medição está desligada
+    """
+    run = getattr(_local, 'run', None) if ENABLED else None
+    if run is None:
+        return None
+    _local.run = None
+    total = time.perf_counter() - run.pop('start')
+    measured = sum(record['seconds'] for record in run['stages'] if record['depth'] == 0)
+    run['stages'].append({'stage': 'outros', 'depth': 0, 'rows': None, 'seconds': total - measured, 'mem_delta_mb': None})
+    # importado aqui: o cache depende dos módulos de dados, que usam este módulo
+    from utils import cache
+    run.update(seconds=total, rss_mb=_rss_mb(), rss_delta_mb=_rss_mb() - run['rss_mb'], cache=cache.stats())
+    del run['depth']
+    _setup_logger()
+    logger.info(json.dumps(run, default=str))
+    return run
+
+def debug_panel():
+    """
+    encerra a medição e mostra na barra lateral a tabela de etapas da execução, com botão
+    para exportar o json. Sem CURRY_PROFILE não mostra nada.
+    Input: None
+    Output: None
+    """
+    run = end_run()
+    if run is None:
+        return
+    import streamlit as st
+    df_aux = pd.DataFrame(run['stages'], columns=['stage', 'depth', 'rows', 'seconds', 'mem_delta_mb'])
+    df_aux['stage'] = ['  ' * depth + name for name, depth in zip(df_aux['stage'], df_aux['depth'])]
+    with st.sidebar.expander('Desempenho desta execução'):
+        st.metric('Tempo total (s)', round(run['seconds'], 3))
+        st.dataframe(df_aux.drop(columns='depth').round(4))
+        cache = run['cache']
+        st.caption('Cache: {} acertos, {} faltas ({:.0%}), {} descartes, {} resultados em {:.1f} de {:.0f} MB'.format(
+            cache['hits'], cache['misses'], cache['hit_rate'], cache['evictions'], cache['entries'],
+            cache['bytes'] / 2**20, cache['max_bytes'] / 2**20))
+        st.download_button('Exportar (json)', json.dumps(run, default=str), file_name='profile_{}.json'.format(run['page']),
+                           mime='application/json')
@@ -0,0 +1,365 @@
+#Libraries
+import functools
+
+#Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+from utils.backend import open_query
+from utils.courier_index import load_courier_index
+from utils.data import snapshot
+from utils.date_index import load_date_index
+from utils.instrument import instrument
+from utils.sketch import load_time_sketch
+
+#========================================
+#Métricas do dashboard
+#========================================
+# Os agregados exibidos pelas páginas, sem Streamlit: cada função recebe uma Selection
+# (os filtros explícitos) e devolve um DataFrame ou um Dict. As páginas só acrescentam
+# títulos e gráficos; os relatórios em lote usam as mesmas funções (python -m reports.export).
+#    sel = Selection('train.csv', date_until='2022-04-06', traffic_options=['Low', 'Jam'], date_from='2022-03-01')
+#    ratings_per_traffic(sel)
+class Selection:
+    """
+    pedidos de um conjunto de filtros: data limite e condições de trânsito (os filtros da
+    barra lateral) e uma data inicial opcional. Sem data limite / condições, valem todo o
+    período / todas as condições do csv.
+    As consultas agregadas (backend.open_query) e os pedidos filtrados (date_index.filter)
+    são criados uma vez, no primeiro uso, e compartilhados por todas as métricas.
+    Tudo vem da entrada do cache em uso na criação (snapshot): uma troca de versão do
+    dataset durante a execução não mistura as duas versões nos resultados.
+    """
+
+    def __init__(self, path = 'train.csv', date_until = None, traffic_options = None, date_from = None):
+        self.path = path
+        self.snapshot = snapshot(path)
+        self.date_index = load_date_index(self.snapshot)
+        self.date_until = self.date_index.max_date if date_until is None else pd.Timestamp(date_until)
+        self.traffic_options = list(self.date_index.traffic_options if traffic_options is None else traffic_options)
+        self.date_from = None if date_from is None else pd.Timestamp(date_from)
+
+    @functools.cached_property
+    def query(self):
+        """
+        consultas agregadas dos filtros (CubeQuery).
+        """
+        return open_query(self.snapshot, self.date_until, self.traffic_options, self.date_from)
+
+    @functools.cached_property
+    def df(self):
+        """
+        DataFrame dos pedidos filtrados (não deve ser alterado). Só é uma fatia sem cópia
+        quando o período não tem pedidos sem trânsito informado (ver DateIndex).
+        """
+        return self.date_index.filter(self.date_until, self.traffic_options, self.date_from)
+
+    def row_range(self):
+        """
+        gera a faixa de linhas [início, fim) do DataFrame limpo dentro das datas da seleção
+        (as linhas estão em ordem de Order_Date, ver date_index).
+        Input: None
+        Output: Int, Int
+        """
+        stop = self.date_index.cutoff(self.date_until)
+        start = min(self.date_index.start_row(self.date_from), stop) if self.date_from is not None else 0
+        return start, stop
+
+    def filters(self):
+        """
+        gera os filtros aplicados, para registro junto dos resultados.
+        Input: None
+        Output: Dict
+        """
+        return {'path': self.path, 'date_from': self.date_from, 'date_until': self.date_until,
+                'traffic_options': self.traffic_options}
+
+#========================================
+#Funções - Visão Empresa
+#========================================
+@instrument
+def orders_by_date(sel):
+    """
+    gera a quantidade de pedidos por dia.
+    Input: Selection
+    Output: DataFrame (Order_Date, ID)
+    """
+    return sel.query.orders('Order_Date').rename(columns={'orders': 'ID'})
+
+@instrument
+def orders_by_traffic(sel):
+    """
+    gera a quantidade e a proporção de pedidos por tipo de tráfego.
+    Input: Selection
+    Output: DataFrame (Road_traffic_density, ID, entregas_perc)
+    """
+    df_aux = sel.query.orders('Road_traffic_density').rename(columns={'orders': 'ID'})
+    df_aux['entregas_perc'] = df_aux['ID'] / df_aux['ID'].sum()
+    return df_aux
+
+@instrument
+def orders_by_traffic_city(sel):
+    """
+    gera a quantidade de pedidos por cidade e tipo de tráfego.
+    Input: Selection
+    Output: DataFrame (City, Road_traffic_density, ID)
+    """
+    return sel.query.orders(['City','Road_traffic_density']).rename(columns={'orders': 'ID'})
+
+@instrument
+def orders_by_week(sel):
+    """
+    gera a quantidade de pedidos por semana do ano.
+    Input: Selection
+    Output: DataFrame (week_of_year, ID)
+    """
+    return sel.query.orders('week_of_year').rename(columns={'orders': 'ID'})
+
+@instrument
+def weekly_orders_per_courier(sel):
+    """
+    gera a média de entregas semanais por entregador: pedidos da semana divididos pela
+    quantidade de entregadores distintos da semana, contados nos pedidos filtrados.
+    Input: Selection
+    Output: DataFrame (week_of_year, ID, Delivery_person_ID, order_by_deliver)
+    """
+    df_pedidos = orders_by_week(sel)
+    df_entregadores = sel.df.loc[:, ['Delivery_person_ID','week_of_year']].groupby('week_of_year').nunique().reset_index()
+    dfaux = pd.merge(df_pedidos,df_entregadores,how='inner')
+    dfaux['order_by_deliver'] = dfaux['ID'] / dfaux['Delivery_person_ID']
+    return dfaux
+
+@instrument
+def delivery_centers(sel):
+    """
+    gera a localização central (mediana) das entregas de cada cidade por tipo de tráfego.
+    Input: Selection
+    Output: DataFrame (City, Road_traffic_density, Delivery_location_latitude, Delivery_location_longitude)
+    """
+    return (sel.df.loc[:,['City','Road_traffic_density','Delivery_location_latitude','Delivery_location_longitude']]
+                  .groupby(['City','Road_traffic_density'], observed=True)
+                  .median()
+                  .reset_index())
+
+#========================================
+#Funções - Visão Entregadores
+#========================================
+@instrument
+def courier_kpis(sel):
+    """
+    gera as métricas gerais dos entregadores: maior e menor idade, melhor e pior condição de veículo.
+    Numa seleção vazia (ou só com valores ausentes) a métrica fica None, que o st.metric
+    exibe como '-' (o pd.NA da coluna Int8 não é aceito por ele).
+    Input: Selection
+    Output: Dict com max_age, min_age, best_vehicle e worst_vehicle
+    """
+    df1 = sel.df
+    kpis = {'max_age': df1['Delivery_person_Age'].max(),
+            'min_age': df1['Delivery_person_Age'].min(),
+            'best_vehicle': df1['Vehicle_condition'].max(),
+            'worst_vehicle': df1['Vehicle_condition'].min()}
+    return {name: (None if pd.isna(value) else value) for name, value in kpis.items()}
+
+@instrument
+def courier_table(sel):
+    """
+    gera a tabela por entregador da seleção (pedidos, avaliação média e tempo médio),
+    servida pelo índice por entregador sem agrupar os pedidos.
+    Input: Selection
+    Output: DataFrame (Delivery_person_ID, orders, Delivery_person_Ratings, avg_time)
+    """
+    start, stop = sel.row_range()
+    return load_courier_index(sel.snapshot).table(start, stop, sel.traffic_options)
+
+@instrument
+def ratings_per_courier(sel):
+    """
+    gera a avaliação média de cada entregador, da maior para a menor.
+    Input: Selection
+    Output: DataFrame (Delivery_person_ID, Delivery_person_Ratings)
+    """
+    return sort_couriers(courier_table(sel), 'Delivery_person_Ratings', ascending=False)[['Delivery_person_ID','Delivery_person_Ratings']]
+
+def sort_couriers(df_couriers, sort_by, ascending = True, search = ''):
+    """
+    ordena a tabela por entregador pela coluna sort_by (empates pelo ID, valores ausentes no
+    fim), mantendo só os IDs que contêm search (sem diferenciar maiúsculas). A busca é feita
+    nos IDs distintos, não nas linhas.
+    Input: DataFrame (courier_table), String, Bool, String
+    Output: DataFrame
+    """
+    if search:
+        ids = df_couriers['Delivery_person_ID'].cat.categories
+        matched = ids[ids.str.contains(search.strip(), case=False, regex=False)]
+        df_couriers = df_couriers.loc[df_couriers['Delivery_person_ID'].isin(matched)]
+    if sort_by == 'Delivery_person_ID':
+        return df_couriers.sort_values(sort_by, ascending=ascending, kind='stable').reset_index(drop=True)
+    return (df_couriers.sort_values(['Delivery_person_ID'], kind='stable')
+                       .sort_values(sort_by, ascending=ascending, kind='stable', na_position='last')
+                       .reset_index(drop=True))
+
+def page(df, number, size):
+    """
+    gera a página number (a partir de 1) de df com size linhas, e a quantidade de páginas.
+    Input: DataFrame, Int, Int
+    Output: DataFrame, Int
+    """
+    pages = max(-(-len(df) // size), 1)
+    number = min(max(int(number), 1), pages)
+    return df.iloc[(number - 1) * size:number * size], pages
+
+@instrument
+def courier_detail(sel, courier):
+    """
+    gera o detalhe de um entregador na seleção: métricas dos seus pedidos e os pedidos em
+    ordem de data, lidos direto das posições do índice por entregador.
+    Input: Selection, String (Delivery_person_ID)
+    Output: Dict com orders, avg_rating, avg_time e avg_distance, DataFrame (pedidos)
+    """
+    start, stop = sel.row_range()
+    positions = load_courier_index(sel.snapshot).courier_positions(courier, start, stop, sel.traffic_options)
+    df_aux = sel.date_index.df.iloc[positions][['Order_Date','City','Road_traffic_density','Type_of_order',
+                                                'Type_of_vehicle','Weatherconditions','distance',
+                                                'Delivery_person_Ratings','Time_taken(min)']]
+    kpis = {'orders': len(df_aux),
+            'avg_rating': np.round(df_aux['Delivery_person_Ratings'].mean(), 2),
+            'avg_time': np.round(df_aux['Time_taken(min)'].mean(), 1),
+            'avg_distance': np.round(df_aux['distance'].mean(), 2)}
+    return kpis, df_aux.reset_index(drop=True)
+
+@instrument
+def ratings_per_traffic(sel):
+    """
+    gera avaliação média e desvio padrão dos entregadores por tipo de tráfego.
+    Input: Selection
+    Output: DataFrame (Road_traffic_density, delivey_mean, delivery_std)
+    """
+    df_avg_std_RpR = sel.query.avg_std('Road_traffic_density', ['ratings'])
+    df_avg_std_RpR.columns=['Road_traffic_density', 'delivey_mean', 'delivery_std']
+    return df_avg_std_RpR
+
+@instrument
+def ratings_per_weather(sel):
+    """
+    gera avaliação média e desvio padrão dos entregadores por tipo de condição climática.
+    Input: Selection
+    Output: DataFrame (Weatherconditions, delivey_mean, delivery_std)
+    """
+    df_avg_std_RpW = sel.query.avg_std('Weatherconditions', ['ratings'])
+    df_avg_std_RpW.columns=['Weatherconditions', 'delivey_mean', 'delivery_std']
+    return df_avg_std_RpW
+
+@instrument
+def top_deliveries(sel, n = 10):
+    """
+    gera os dataframes dos n entregadores mais rápidos e mais lentos por cidade.
+    A média por entregador é calculada uma vez só e a seleção dos n de cada cidade é feita
+    por seleção parcial dentro de cada grupo (nsmallest/nlargest), sem ordenar a tabela toda.
+    Input: Selection, Int
+    Output: DataFrame (mais rápidos), DataFrame (mais lentos)
+    """
+    df_aux = (sel.df.loc[:,['Delivery_person_ID','City','Time_taken(min)']]
+                .groupby(['City','Delivery_person_ID'], observed=True)
+                .mean()
+                .reset_index())
+    time_by_city = df_aux.groupby('City', observed=True)['Time_taken(min)']
+    df_top = df_aux.loc[time_by_city.nsmallest(n).index.get_level_values(-1).to_numpy()].reset_index(drop=True)
+    df_bottom = (df_aux.loc[time_by_city.nlargest(n).index.get_level_values(-1).to_numpy()]
+                   .sort_values('City', ascending=False, kind='stable')
+                   .reset_index(drop=True))
+    return df_top, df_bottom
+
+#========================================
+#Funções - Visão Restaurantes
+#========================================
+@instrument
+def restaurant_kpis(sel):
+    """
+    gera de uma só vez as métricas gerais dos restaurantes: quantidade de entregadores,
+    distância média e média/desvio padrão do tempo de entrega durante e fora do Festival.
+    As estatísticas do Festival saem de uma única consulta agrupada por Festival e a
+    distância média de uma consulta sem agrupamento.
+    Input: Selection
+    Output: Dict com qnt_deliver, avg_dist e festival[Yes/No][avg_time/std_time]
+    """
+    df_aux = sel.query.avg_std('Festival', ['time']).set_index('Festival')
+    avg_dist = sel.query.avg_std([], ['distance'])['avg_distance'].iloc[0]
+    festival = {fest: {calc: (np.round(df_aux.loc[fest, calc], 3) if fest in df_aux.index else np.nan)
+                       for calc in ('avg_time', 'std_time')}
+                for fest in ('Yes', 'No')}
+    return {'qnt_deliver': sel.df.loc[:, 'Delivery_person_ID'].nunique(),
+            'avg_dist': np.round(avg_dist, 3),
+            'festival': festival}
+
+@instrument
+def avg_time_by_city(sel):
+    """
+    gera tempo médio e desvio padrão das entregas por cidade.
+    Input: Selection
+    Output: DataFrame (City, avg_time, std_time)
+    """
+    return sel.query.avg_std('City', ['time'])
+
+@instrument
+def avg_distance_by_city(sel):
+    """
+    gera distância média e desvio padrão das entregas por cidade.
+    Input: Selection
+    Output: DataFrame (City, avg_distance, std_distance)
+    """
+    return sel.query.avg_std('City', ['distance'])
+
+@instrument
+def delivery_time_percentiles(sel, by = ('City', 'Road_traffic_density')):
+    """
+    gera os percentis p50, p90 e p99 do tempo de entrega por grupo, a partir do histograma
+    de minutos por célula (sketch.TimeSketch), iguais aos do groupby com interpolation='lower'.
+    Input: Selection, String ou lista de Strings ([] para o total)
+    Output: DataFrame (grupos, orders, p50, p90, p99)
+    """
+    return load_time_sketch(sel.snapshot).quantiles(by, sel.date_until, sel.traffic_options, sel.date_from)
+
+@instrument
+def avg_time_city_traffic(sel):
+    """
+    gera tempo/distância médio e desvio padrão das entregas por cidade e tipo de tráfego.
+    Input: Selection
+    Output: DataFrame
+    """
+    return sel.query.avg_std(['City','Road_traffic_density'], ['time', 'distance'])
+
+@instrument
+def df_avg_std_city_order(sel):
+    """
+    gera tempo/distância médio e desvio padrão das entregas por cidade e tipo de pedido.
+    Input: Selection
+    Output: DataFrame
+    """
+    return sel.query.avg_std(['City','Type_of_order'], ['time', 'distance'])
+
+#========================================
+#Todas as métricas
+#========================================
+# nome no relatório -> função; top_deliveries devolve duas tabelas e entra no compute_all
+METRICS = {'orders_by_date': orders_by_date, 'orders_by_traffic': orders_by_traffic,
+           'orders_by_traffic_city': orders_by_traffic_city, 'orders_by_week': orders_by_week,
+           'weekly_orders_per_courier': weekly_orders_per_courier, 'delivery_centers': delivery_centers,
+           'courier_kpis': courier_kpis, 'courier_table': courier_table, 'ratings_per_courier': ratings_per_courier,
+           'ratings_per_traffic': ratings_per_traffic, 'ratings_per_weather': ratings_per_weather,
+           'restaurant_kpis': restaurant_kpis, 'avg_time_by_city': avg_time_by_city,
+           'avg_distance_by_city': avg_distance_by_city, 'delivery_time_percentiles': delivery_time_percentiles,
+           'avg_time_city_traffic': avg_time_city_traffic, 'df_avg_std_city_order': df_avg_std_city_order}
+METRIC_NAMES = list(METRICS) + ['fastest_deliveries', 'slowest_deliveries']
+
+def compute_all(sel, names = None, top_n = 10):
+    """
+    calcula as métricas de uma seleção, compartilhando o filtro e as consultas entre elas.
+    Input: Selection, lista de nomes (padrão METRIC_NAMES), Int (entregadores por cidade)
+    Output: Dict nome -> DataFrame ou Dict
+    """
+    names = METRIC_NAMES if names is None else names
+    results = {name: METRICS[name](sel) for name in names if name in METRICS}
+    if 'fastest_deliveries' in names or 'slowest_deliveries' in names:
+        df_top, df_bottom = top_deliveries(sel, top_n)
+        results.update({name: df for name, df in (('fastest_deliveries', df_top), ('slowest_deliveries', df_bottom))
+                        if name in names})
+    return results
@@ -0,0 +1,163 @@
+#Libraries
+import atexit
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+#Bibliotecas necessárias
+import numpy as np
+
+#========================================
+#Execução em vários processos
+#========================================
+# A limpeza do csv e os agregados de histórico inteiro (cubo diário) podem ser divididos
+# em partes independentes: trechos de linhas do csv ou fatias de linhas do DataFrame limpo.
+# Cada parte é processada num processo do pool e os resultados parciais (DataFrames limpos,
+# cubos com quantidades, somas e somas dos quadrados) são juntados na ordem das partes,
+# dando o mesmo resultado da execução num processo só.
+# Ligado com CURRY_WORKERS=<processos> ('auto' ou 0 = um por núcleo); o padrão 1 mantém
+# tudo no processo do Streamlit. Os processos são criados com 'spawn' (seguro com as
+# threads das sessões do Streamlit) uma vez por processo e reaproveitados entre cargas.
+def _workers_from_env(value):
+    """
+    gera a quantidade de processos configurada em CURRY_WORKERS.
+    Input: String
+    Output: Int
+    """
+    if value.strip().lower() in ('auto', '0'):
+        return os.cpu_count() or 1
+    try:
+        return max(int(value), 1)
+    except ValueError:
+        return 1
+
+WORKERS = _workers_from_env(os.environ.get('CURRY_WORKERS', '1'))
+
+# abaixo desses tamanhos o custo de enviar os dados aos processos é maior que o ganho
+PARALLEL_MIN_BYTES = 32 * 2**20
+PARALLEL_MIN_ROWS = 500_000
+
+# tamanho de cada trecho do csv limpo num processo (~200 mil linhas do train.csv)
+PART_BYTES = 32 * 2**20
+
+# partes enviadas ao pool à frente da que está sendo devolvida, por processo: limita os
+# resultados prontos em memória quando quem consome (ex.: a gravação em Parquet) é mais lento
+LOOKAHEAD = 2
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+#========================================
+#Funções
+#========================================
+def enabled(size = None, rows = None):
+    """
+    informa se o trabalho deve ir para o pool: CURRY_WORKERS maior que 1 e entrada grande o
+    bastante (bytes do csv ou linhas do DataFrame).
+    Input: Int (bytes, opcional), Int (linhas, opcional)
+    Output: Bool
+    """
+    if WORKERS <= 1:
+        return False
+    return (size is not None and size >= PARALLEL_MIN_BYTES) or (rows is not None and rows >= PARALLEL_MIN_ROWS)
+
+def _get_pool():
+    """
+    gera o pool de processos do processo atual, criado na primeira chamada.
+    Input: None
+    Output: ProcessPoolExecutor
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != WORKERS:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = WORKERS
+        return _pool
+
+def shutdown():
+    """
+    encerra o pool de processos (chamado também na saída do processo).
+    Input: None
+    Output: None
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+atexit.register(shutdown)
+
+def pool_map(fn, tasks):
+    """
+    aplica fn(*argumentos) a cada tarefa no pool e devolve os resultados na ordem das
+    tarefas, à medida que ficam prontos. Com CURRY_WORKERS=1 ou uma tarefa só, roda no
+    próprio processo. Se um processo do pool morrer, o pool é descartado e as tarefas que
+    faltam são feitas aqui mesmo: o pool é só uma otimização.
+    Input: função (definida no nível de um módulo), lista de tuplas de argumentos
+    Output: gerador de resultados
+    """
+    tasks = list(tasks)
+    if WORKERS <= 1 or len(tasks) <= 1:
+        for args in tasks:
+            yield fn(*args)
+        return
+
+    done = 0
+    futures = deque()
+    try:
+        pool = _get_pool()
+        for args in tasks:
+            futures.append(pool.submit(fn, *args))
+            if len(futures) >= LOOKAHEAD * WORKERS:
+                result = futures.popleft().result()
+                done += 1
+                yield result
+        while futures:
+            result = futures.popleft().result()
+            done += 1
+            yield result
+    except BrokenProcessPool:
+        shutdown()
+        for args in tasks[done:]:
+            yield fn(*args)
+    finally:
+        for future in futures:
+            future.cancel()
+
+def split_rows(rows, parts = None):
+    """
+    divide rows linhas em faixas contínuas [início, fim), uma por processo.
+    Input: Int, Int (quantidade de faixas, padrão CURRY_WORKERS)
+    Output: lista de tuplas (início, fim)
+    """
+    bounds = np.linspace(0, rows, (parts or WORKERS) + 1).astype('int64')
+    return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+def split_file(path, start = 0, part_bytes = PART_BYTES):
+    """
+    divide o arquivo a partir do byte start em trechos de linhas inteiras [início, fim), com
+    no mínimo um trecho por processo e no máximo part_bytes bytes por trecho (aprox.).
+    Cada corte é levado até o fim da linha em que cai; o csv não tem quebras de linha
+    dentro de campos entre aspas.
+    Input: String, Int, Int
+    Output: lista de tuplas (início, fim) em bytes
+    """
+    size = os.path.getsize(path)
+    parts = max(WORKERS, -(-(size - start) // part_bytes), 1)
+    bounds = [start]
+    with open(path, 'rb') as f:
+        for cut in np.linspace(start, size, parts + 1)[1:-1].astype('int64'):
+            if cut <= bounds[-1]:
+                continue
+            f.seek(cut)
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(begin, end) for begin, end in zip(bounds[:-1], bounds[1:]) if end > begin]
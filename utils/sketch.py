@@ -0,0 +1,154 @@
+#Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+from utils.cube import filter_cube
+from utils.data import concat_clean, load_derived
+from utils.instrument import instrument
+
+#========================================
+#Sketches por célula
+#========================================
+# Resumos que, como o cubo diário, guardam uma linha por combinação distinta das dimensões
+# (célula) e se combinam para qualquer data limite, filtro de trânsito e agrupamento:
+#    - TimeSketch: histograma do Time_taken(min) por célula. O tempo é guardado em minutos
+#      inteiros (int16), então o histograma de minutos é um sketch de quantis sem erro,
+#      do tamanho da quantidade de minutos distintos, que se junta somando as contagens.
+# É montado junto com o DataFrame limpo e atualizado só com as linhas novas quando o csv
+# cresce (ver data.load_derived).
+TIME_DIMENSIONS = ['Order_Date', 'City', 'Road_traffic_density']
+
+PERCENTILES = [0.5, 0.9, 0.99]
+PERCENTILE_COLUMNS = ['p{:g}'.format(q * 100) for q in PERCENTILES]
+
+class CellSketch:
+    """
+    tabela de células (dimensões) com uma linha da matriz de resumo para cada célula.
+    As subclasses definem como as linhas se combinam (combine, padrão soma).
+    """
+    combine = np.add
+
+    def __init__(self, cells, matrix):
+        self.cells = cells.reset_index(drop=True)
+        self.matrix = matrix
+
+    @staticmethod
+    def cell_ids(df_keys):
+        """
+        gera o código da célula de cada linha e a tabela de células (na ordem em que
+        aparecem), mantendo as células com valores ausentes.
+        Input: DataFrame (só as colunas das dimensões)
+        Output: array de códigos, DataFrame (células)
+        """
+        ids = df_keys.groupby(list(df_keys.columns), sort=False, observed=True, dropna=False).ngroup().to_numpy()
+        first = np.unique(ids, return_index=True)[1]
+        return ids, df_keys.iloc[first].reset_index(drop=True)
+
+    def _merge_cells(self, other):
+        """
+        junta as células dos dois sketches (a mesma célula nos dois vira uma só).
+        Input: CellSketch
+        Output: DataFrame (células), array de códigos das células de self, array das de other
+        """
+        ids, cells = self.cell_ids(concat_clean([self.cells, other.cells]))
+        return cells, ids[:len(self.cells)], ids[len(self.cells):]
+
+    @instrument
+    def merge(self, other):
+        """
+        junta dois sketches (ex.: o do histórico e o das linhas novas do csv).
+        Input: CellSketch
+        Output: CellSketch
+        """
+        cells, ids_self, ids_other = self._merge_cells(other)
+        matrix = np.zeros((len(cells), self.matrix.shape[1]), dtype=self.matrix.dtype)
+        self.combine.at(matrix, ids_self, self.matrix)
+        self.combine.at(matrix, ids_other, other.matrix)
+        return type(self)(cells, matrix)
+
+    def group(self, by, date_until, traffic_options, date_from = None):
+        """
+        aplica os filtros às células e combina as linhas da matriz por grupo.
+        Com by vazio ([]) o resultado é uma linha com todas as células filtradas.
+        Input: String ou lista de Strings, datetime, lista de Strings, datetime (opcional)
+        Output: DataFrame (grupos, em ordem), array (uma linha combinada por grupo)
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        cells = filter_cube(self.cells, date_until, traffic_options, date_from)
+        if len(by) == 0:
+            keys, ids = pd.DataFrame(index=[0]), np.zeros(len(cells), dtype='int64')
+        else:
+            grouped = cells.groupby(by, observed=True)
+            keys = grouped.size().reset_index()[by]
+            # linhas com valor ausente em by ficam sem grupo (-1), como no groupby
+            ids = grouped.ngroup().fillna(-1).to_numpy().astype('int64')
+        valid = ids >= 0
+        matrix = np.zeros((len(keys), self.matrix.shape[1]), dtype=self.matrix.dtype)
+        self.combine.at(matrix, ids[valid], self.matrix[cells.index.to_numpy()[valid]])
+        return keys, matrix
+
+class TimeSketch(CellSketch):
+    """
+    histograma do tempo de entrega (minutos inteiros) por data, cidade e tráfego.
+    values são os minutos das colunas da matriz, em ordem crescente.
+    """
+
+    def __init__(self, cells, matrix, values):
+        super().__init__(cells, matrix)
+        self.values = values
+
+    @instrument
+    def merge(self, other):
+        """
+        junta dois histogramas, com a união dos minutos das colunas.
+        Input: TimeSketch
+        Output: TimeSketch
+        """
+        values = np.union1d(self.values, other.values)
+        cells, ids_self, ids_other = self._merge_cells(other)
+        matrix = np.zeros((len(cells), len(values)), dtype=self.matrix.dtype)
+        for ids, sketch in ((ids_self, self), (ids_other, other)):
+            cols = np.searchsorted(values, sketch.values)
+            np.add.at(matrix, (ids[:, None], cols[None, :]), sketch.matrix)
+        return TimeSketch(cells, matrix, values)
+
+    def quantiles(self, by, date_until, traffic_options, date_from = None, qs = PERCENTILES):
+        """
+        gera os percentis do tempo de entrega por grupo, iguais a
+        df1.groupby(by)['Time_taken(min)'].quantile(q, interpolation='lower').
+        Input: String ou lista de Strings ([] para o total), datetime, lista de Strings, datetime, lista de Floats
+        Output: DataFrame com os grupos, orders e uma coluna p<percentil> por q (ex.: p50, p90, p99)
+        """
+        df_aux, counts = self.group(by, date_until, traffic_options, date_from)
+        cum = counts.cumsum(axis=1)
+        n = counts.sum(axis=1)
+        df_aux['orders'] = n
+        for q in qs:
+            # posição (a partir de 0) do percentil nos tempos ordenados do grupo
+            k = np.floor((n - 1) * q)
+            idx = np.minimum((cum <= k[:, None]).sum(axis=1), max(len(self.values) - 1, 0))
+            df_aux['p{:g}'.format(q * 100)] = np.where(n > 0, self.values[idx] if len(self.values) else np.nan, np.nan)
+        return df_aux
+
+#========================================
+#Funções
+#========================================
+@instrument
+def build_time_sketch(df1):
+    """
+    gera o histograma do tempo de entrega por data, cidade e tráfego.
+    Input: DataFrame limpo
+    Output: TimeSketch
+    """
+    ids, cells = CellSketch.cell_ids(df1[TIME_DIMENSIONS])
+    values, cols = np.unique(df1['Time_taken(min)'].to_numpy(), return_inverse=True)
+    matrix = np.zeros((len(cells), len(values)), dtype='int64')
+    np.add.at(matrix, (ids, cols), 1)
+    return TimeSketch(cells, matrix, values)
+
+def load_time_sketch(path = 'train.csv'):
+    """
+    carrega o histograma do tempo de entrega do csv (ver data.load_derived).
+    Input: String (ou entrada, ver data.snapshot)
+    Output: TimeSketch
+    """
+    return load_derived(path, 'time_sketch', build_time_sketch, lambda old, new: old.merge(new))
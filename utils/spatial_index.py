@@ -0,0 +1,101 @@
+#Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+from utils.data import load_derived
+from utils.geo import AVG_EARTH_RADIUS_KM, grid_cells, haversine_np
+from utils.instrument import instrument
+
+#========================================
+#Índice espacial em grade
+#========================================
+# Tamanho da célula da grade em graus (~5,5 km de latitude). As buscas por raio só olham
+# as células que cruzam o quadrado em volta do círculo, e a distância haversine é
+# calculada apenas para os pedidos dessas células.
+GRID_CELL_DEG = 0.05
+
+# Quilômetros por grau de latitude (e de longitude no equador)
+KM_PER_DEG = np.pi * AVG_EARTH_RADIUS_KM / 180
+
+class GridIndex:
+    """
+    índice espacial dos pedidos pela localização do restaurante ou da entrega.
+    Cada pedido recebe o código da sua célula numa grade regular de cell_deg graus e as
+    posições das linhas ficam ordenadas por célula, então os pedidos de uma célula (ou de
+    uma faixa de células vizinhas na mesma linha da grade) são uma fatia contínua.
+    Coordenadas zeradas (não informadas) ficam fora do índice.
+    O centro médio da célula com mais pedidos (densest_center) é calculado junto com o
+    índice, para servir de ponto inicial das buscas sem agrupar os pedidos a cada execução.
+    As posições devolvidas são as do DataFrame limpo em cache (df.iloc[posições]).
+    """
+
+    @instrument
+    def __init__(self, df1, point = 'Restaurant', cell_deg = GRID_CELL_DEG):
+        self.df = df1
+        self.point = point
+        self.cell_deg = cell_deg
+        self.ncols = int(np.ceil(360 / cell_deg)) + 1
+        self.lat = df1[point + '_latitude'].to_numpy(dtype='float64')
+        self.lng = df1[point + '_longitude'].to_numpy(dtype='float64')
+        valid = (self.lat != 0) & (self.lng != 0) & ~np.isnan(self.lat) & ~np.isnan(self.lng)
+
+        # célula de cada linha (-1 quando a coordenada não foi informada)
+        self.cells = np.full(len(df1), -1, dtype='int64')
+        self.cells[valid] = grid_cells(self.lat[valid], self.lng[valid], cell_deg)
+        positions = np.flatnonzero(valid)
+        order = np.argsort(self.cells[positions], kind='stable')
+        self.positions = positions[order]
+        self.sorted_cells = self.cells[self.positions]
+
+        # as células ficam em fatias contínuas: a maior fatia é a célula com mais pedidos
+        # (a de menor código no empate, como no idxmax do cell_stats)
+        self.densest_center = (0.0, 0.0)
+        if len(self.positions) > 0:
+            starts = np.flatnonzero(np.r_[True, self.sorted_cells[1:] != self.sorted_cells[:-1]])
+            counts = np.diff(np.r_[starts, len(self.positions)])
+            first = starts[counts.argmax()]
+            densest = self.positions[first:first + counts.max()]
+            self.densest_center = (float(self.lat[densest].mean()), float(self.lng[densest].mean()))
+
+    @instrument
+    def query_radius(self, lat, lng, km):
+        """
+        gera as posições dos pedidos a até km quilômetros do ponto (lat, lng), em ordem crescente.
+        Input: Float, Float, Float
+        Output: array de posições (int64)
+        """
+        dlat = km / KM_PER_DEG
+        dlng = km / (KM_PER_DEG * max(np.cos(np.radians(lat + np.sign(lat) * dlat)), 1e-6))
+        row_min, col_min = (np.floor(np.array([lat - dlat + 90, lng - dlng + 180]) / self.cell_deg)).astype('int64')
+        row_max, col_max = (np.floor(np.array([lat + dlat + 90, lng + dlng + 180]) / self.cell_deg)).astype('int64')
+        rows = np.arange(row_min, row_max + 1)
+        starts = np.searchsorted(self.sorted_cells, rows * self.ncols + col_min, side='left')
+        stops = np.searchsorted(self.sorted_cells, rows * self.ncols + col_max, side='right')
+        if not (stops > starts).any():
+            return np.empty(0, dtype='int64')
+        candidates = np.concatenate([self.positions[start:stop] for start, stop in zip(starts, stops)])
+        dist = haversine_np(lat, lng, self.lat[candidates], self.lng[candidates])
+        return np.sort(candidates[dist <= km])
+
+    @instrument
+    def cell_stats(self, positions = None):
+        """
+        gera a quantidade de pedidos e o tempo médio de entrega por célula (bairro), com o
+        centro médio dos pontos de cada célula.
+        Input: array de posições (opcional, padrão todos os pedidos do índice)
+        Output: DataFrame com as colunas latitude, longitude, pedidos e tempo_medio
+        """
+        positions = self.positions if positions is None else positions[self.cells[positions] >= 0]
+        df_aux = pd.DataFrame({'cell': self.cells[positions], 'latitude': self.lat[positions], 'longitude': self.lng[positions],
+                               'time': self.df['Time_taken(min)'].to_numpy(dtype='float64')[positions]})
+        df_aux = df_aux.groupby('cell').agg(latitude=('latitude', 'mean'), longitude=('longitude', 'mean'),
+                                            pedidos=('time', 'size'), tempo_medio=('time', 'mean'))
+        return df_aux.reset_index(drop=True)
+
+def load_grid_index(path = 'train.csv', point = 'Restaurant'):
+    """
+    carrega o índice espacial do csv pela localização do restaurante ('Restaurant') ou da
+    entrega ('Delivery_location'), refeito só quando o csv muda (ver data.load_derived).
+    Input: String (ou entrada, ver data.snapshot), String
+    Output: GridIndex
+    """
+    return load_derived(path, 'grid_index_' + point, lambda df1: GridIndex(df1, point))
@@ -0,0 +1,228 @@
+#Libraries
+import functools
+import json
+import os
+import uuid
+
+#Bibliotecas necessárias
+from utils.instrument import instrument
+
+#========================================
+#Cache em disco (Parquet)
+#========================================
+# O DataFrame limpo é gravado em train.parquet/, ao lado do train.csv. O manifest.json
+# guarda a assinatura do csv de origem e a versão da limpeza que gerou os arquivos,
+# e só é gravado depois das partes, então um cache pela metade nunca é lido.
+MANIFEST = 'manifest.json'
+
+# Cada carga incremental (linhas novas no final do csv) soma uma parte pequena. Acima de
+# MAX_PARTS partes, elas são regravadas numa só (compact_parts), para que a leitura do
+# cache não fique cada vez mais lenta com arquivos pequenos acumulados.
+MAX_PARTS = 8
+
+#========================================
+#Funções
+#========================================
+@functools.lru_cache(maxsize=None)
+def arrow():
+    """
+    importa o pyarrow na primeira leitura ou gravação do cache em disco, e não na abertura
+    das páginas (a importação custa ~0,2 s).
+    Input: None
+    Output: módulos pyarrow e pyarrow.parquet, ou (None, None) quando o pyarrow não está
+            instalado: o cache em disco fica desligado e o csv é sempre limpo na carga
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None, None
+    return pa, pq
+
+def available():
+    """
+    informa se o cache em disco pode ser usado (pyarrow instalado).
+    Input: None
+    Output: Bool
+    """
+    return arrow()[1] is not None
+
+def store_path(csv_path):
+    """
+    gera o caminho do diretório do cache em disco para um csv (train.csv -> train.parquet).
+    Input: String
+    Output: String
+    """
+    return os.path.splitext(csv_path)[0] + '.parquet'
+
+def read_manifest(csv_path):
+    """
+    lê o manifest do cache em disco do csv.
+    Input: String
+    Output: Dict ou None quando não há cache
+    """
+    if not os.path.exists(os.path.join(store_path(csv_path), MANIFEST)) or not available():
+        return None
+    try:
+        with open(os.path.join(store_path(csv_path), MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_manifest(csv_path, manifest):
+    """
+    grava o manifest de forma atômica (arquivo temporário + os.replace).
+    Input: String, Dict
+    Output: None
+    """
+    path = os.path.join(store_path(csv_path), MANIFEST)
+    tmp = path + '.' + uuid.uuid4().hex
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+def update_source(csv_path, manifest, source):
+    """
+    atualiza a assinatura do csv no manifest sem regravar as partes, usado quando o
+    conteúdo do csv é o mesmo mas a data de modificação mudou (ex.: cópia no deploy).
+    Input: String, Dict, Dict
+    Output: None
+    """
+    try:
+        write_manifest(csv_path, dict(manifest, source=source))
+    except OSError:
+        pass
+
+@instrument
+def read_store(csv_path, manifest):
+    """
+    carrega o DataFrame limpo a partir do cache em disco descrito pelo manifest.
+    Os arquivos são abertos com memory map, evitando cópias na leitura.
+    Input: String, Dict
+    Output: DataFrame ou None quando o cache está incompleto
+    """
+    pa, pq = arrow()
+    root = store_path(csv_path)
+    if not manifest['parts']:
+        return None
+    try:
+        tables = [pq.read_table(os.path.join(root, part), memory_map=True) for part in manifest['parts']]
+    except (OSError, pa.ArrowException):
+        return None
+    df1 = pa.concat_tables(tables).to_pandas()
+    # os dicionários de pedaços diferentes são unidos na ordem em que aparecem; a limpeza
+    # gera as categorias em ordem alfabética, então essa ordem é refeita aqui
+    for col in df1.select_dtypes('category'):
+        categories = df1[col].cat.categories
+        if not categories.is_monotonic_increasing:
+            df1[col] = df1[col].cat.reorder_categories(categories.sort_values())
+    return df1
+
+def _remove_parts(root, parts):
+    """
+    apaga partes do cache em disco, ignorando as que já não existem.
+    Input: String, lista de Strings
+    Output: None
+    """
+    for part in parts:
+        try:
+            os.remove(os.path.join(root, part))
+        except OSError:
+            pass
+
+def _store_schema(table):
+    """
+    gera o schema fixo de uma parte a partir do primeiro pedaço gravado: as colunas category
+    viram dicionários de texto com índice int32, para que pedaços com quantidades diferentes
+    de categorias (ou sem nenhuma) tenham o mesmo tipo.
+    Input: pyarrow.Table
+    Output: pyarrow.Schema
+    """
+    pa = arrow()[0]
+    fields = [pa.field(field.name, pa.dictionary(pa.int32(), pa.string())) if pa.types.is_dictionary(field.type) else field
+              for field in table.schema]
+    return pa.schema(fields, metadata=table.schema.metadata)
+
+@instrument
+def write_store_chunks(csv_path, chunks, source, version, base = None):
+    """
+    grava no cache em disco os pedaços já limpos do csv, um grupo de linhas do Parquet por
+    pedaço, sem juntar os pedaços em memória, e aponta o manifest para a nova parte.
+    Com base (o manifest atual), a parte nova é somada às partes já existentes: é assim que
+    as linhas acrescentadas ao final do csv entram no cache sem regravar o histórico.
+    Acima de MAX_PARTS partes, todas são juntadas numa só (compact_parts) antes do manifest.
+    Partes que deixaram de fazer parte do manifest são apagadas depois que ele está no lugar.
+    Falhas de escrita (disco cheio, diretório somente leitura) são ignoradas: o cache em
+    disco é só uma otimização.
+    Input: String, iterável de DataFrames, Dict (assinatura do csv), Int (versão da limpeza), Dict
+    Output: Dict (manifest gravado) ou None quando não foi possível gravar
+    """
+    pa, pq = arrow()
+    if pq is None:
+        return None
+    root = store_path(csv_path)
+    old = read_manifest(csv_path)
+    part = 'part-' + uuid.uuid4().hex + '.parquet'
+    created = [part]
+    rows = 0
+    writer = None
+    try:
+        os.makedirs(root, exist_ok=True)
+        try:
+            for df1 in chunks:
+                table = pa.Table.from_pandas(df1, preserve_index=False)
+                if writer is None:
+                    schema = _store_schema(table)
+                    writer = pq.ParquetWriter(os.path.join(root, part), schema)
+                writer.write_table(table.cast(schema))
+                rows += len(df1)
+        finally:
+            if writer is not None:
+                writer.close()
+        parts = (base['parts'] if base is not None else []) + ([part] if writer is not None else [])
+        rows += base['rows'] if base is not None else 0
+        if len(parts) > MAX_PARTS:
+            parts = [compact_parts(root, parts)]
+            created.append(parts[0])
+        manifest = {'version': version, 'source': source, 'parts': parts, 'rows': rows}
+        write_manifest(csv_path, manifest)
+    except (OSError, pa.ArrowException):
+        _remove_parts(root, created)
+        return None
+    _remove_parts(root, [stale for stale in (old or {}).get('parts', []) + created if stale not in parts])
+    return manifest
+
+@instrument
+def compact_parts(root, parts):
+    """
+    regrava as partes do cache em disco numa parte nova, na mesma ordem, lendo uma parte
+    por vez (cada uma vira um ou mais grupos de linhas da parte nova). As partes antigas
+    continuam no lugar até o manifest deixar de apontar para elas.
+    Input: String (diretório do cache), lista de Strings (partes)
+    Output: String (nome da parte nova)
+    """
+    pa, pq = arrow()
+    part = 'part-' + uuid.uuid4().hex + '.parquet'
+    writer = None
+    try:
+        for name in parts:
+            table = pq.read_table(os.path.join(root, name), memory_map=True)
+            if writer is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(os.path.join(root, part), schema)
+            writer.write_table(table.cast(schema))
+    except (OSError, pa.ArrowException):
+        if writer is not None:
+            writer.close()
+        _remove_parts(root, [part])
+        raise
+    writer.close()
+    return part
+
+def write_store(csv_path, df1, source, version):
+    """
+    grava o DataFrame limpo inteiro no cache em disco (uma parte com um único pedaço).
+    Input: String, DataFrame, Dict (assinatura do csv), Int (versão da limpeza)
+    Output: Dict (manifest gravado) ou None quando não foi possível gravar
+    """
+    return write_store_chunks(csv_path, [df1], source, version)